@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+JANMITRA AI Services - Admission Control
+Priority lanes and load shedding so emergency complaints stay fast under load
+"""
+
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+
+
+class Overloaded(Exception):
+    """Raised when a low-risk request is shed"""
+
+    message = "Service overloaded, retry later"
+
+    def __init__(self, retry_after: int = 5):
+        super().__init__(self.message)
+        self.retry_after = retry_after
+
+
+class RateLimited(Overloaded):
+    """Raised when a lane's rate bucket is empty"""
+
+    message = "Rate limit exceeded, retry later"
+
+
+class TokenBucket:
+    """
+    Non-blocking token bucket: `rate` tokens per `period` seconds, holding at
+    most `burst` (default `rate`). `try_acquire` never waits, so it is safe to
+    call on the event loop.
+    """
+
+    __slots__ = ('rate', 'period', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate: float, period: float = 60.0, burst: Optional[float] = None):
+        self.rate = rate
+        self.period = period
+        self.burst = burst if burst is not None else rate
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate / self.period)
+        self.updated = now
+
+    def try_acquire(self) -> bool:
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def retry_after(self) -> int:
+        """Seconds until the next token is available"""
+        self._refill()
+        return max(1, math.ceil((1 - self.tokens) * self.period / self.rate))
+
+
+class Admission:
+    """Outcome of admitting a request"""
+
+    __slots__ = ('high_risk', 'degraded')
+
+    def __init__(self, high_risk: bool, degraded: bool):
+        self.high_risk = high_risk
+        # Degraded requests must skip expensive work such as LLM calls
+        self.degraded = degraded
+
+
+class AdmissionController:
+    """
+    Limits concurrent analyses and gives high-risk requests their own lane.
+
+    Up to `max_concurrency` requests run at once, but `high_risk_reserve` of
+    those slots are only usable by high-risk requests, and waiting high-risk
+    requests are always admitted before low-risk ones. Low-risk requests are
+    degraded once their queue or the latency average passes the `degrade_*`
+    thresholds, and rejected with `Overloaded` past the `shed_*` thresholds.
+    High-risk requests are never degraded or shed.
+
+    Each lane also has its own rate bucket (`low_risk_rate` and the larger
+    `high_risk_rate`, per minute; None disables it). A request whose bucket
+    is empty is rejected with `RateLimited` before it queues. High-risk
+    classification is a keyword match any client can trigger, so the
+    high-risk lane is rate limited too, just more generously.
+    """
+
+    def __init__(self, max_concurrency: int = 16, high_risk_reserve: int = 4,
+                 degrade_queue: int = 8, shed_queue: int = 64,
+                 degrade_latency: float = 2.0, shed_latency: float = 8.0,
+                 ewma_alpha: float = 0.2, low_risk_rate: Optional[float] = None,
+                 high_risk_rate: Optional[float] = None):
+        self.max_concurrency = max_concurrency
+        self.high_risk_reserve = min(high_risk_reserve, max_concurrency - 1)
+        self.degrade_queue = degrade_queue
+        self.shed_queue = shed_queue
+        self.degrade_latency = degrade_latency
+        self.shed_latency = shed_latency
+        self.ewma_alpha = ewma_alpha
+
+        self.in_flight = 0
+        self.waiting = {'high': 0, 'low': 0}
+        self.latency_ewma = 0.0
+        self.shed_count = 0
+        self.degraded_count = 0
+        self.rate_limited_count = 0
+        self.buckets = {
+            'high': TokenBucket(high_risk_rate) if high_risk_rate else None,
+            'low': TokenBucket(low_risk_rate) if low_risk_rate else None,
+        }
+        self._cond = None
+
+    def _condition(self) -> asyncio.Condition:
+        # Created lazily so it binds to the running event loop
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        return self._cond
+
+    def _can_run(self, high_risk: bool) -> bool:
+        if high_risk:
+            return self.in_flight < self.max_concurrency
+        return (self.waiting['high'] == 0 and
+                self.in_flight < self.max_concurrency - self.high_risk_reserve)
+
+    def _pressure(self) -> str:
+        """'ok', 'degrade' or 'shed' for a newly arriving low-risk request"""
+        # Latency only counts while the low-risk lane is saturated; otherwise
+        # the request would run immediately (and a stale average can't lock
+        # the lane out forever)
+        saturated = self.in_flight >= self.max_concurrency - self.high_risk_reserve
+        latency = self.latency_ewma if saturated else 0.0
+        if self.waiting['low'] >= self.shed_queue or latency >= self.shed_latency:
+            return 'shed'
+        if self.waiting['low'] >= self.degrade_queue or latency >= self.degrade_latency:
+            return 'degrade'
+        return 'ok'
+
+    @asynccontextmanager
+    async def admit(self, high_risk: bool) -> AsyncIterator[Admission]:
+        lane = 'high' if high_risk else 'low'
+        bucket = self.buckets[lane]
+        if bucket is not None and not bucket.try_acquire():
+            self.rate_limited_count += 1
+            raise RateLimited(retry_after=bucket.retry_after())
+
+        degraded = False
+        if not high_risk:
+            pressure = self._pressure()
+            if pressure == 'shed':
+                self.shed_count += 1
+                raise Overloaded(retry_after=max(1, round(self.latency_ewma)))
+            degraded = pressure == 'degrade'
+            if degraded:
+                self.degraded_count += 1
+
+        cond = self._condition()
+        async with cond:
+            self.waiting[lane] += 1
+            try:
+                await cond.wait_for(lambda: self._can_run(high_risk))
+            finally:
+                self.waiting[lane] -= 1
+            self.in_flight += 1
+
+        started = time.perf_counter()
+        try:
+            yield Admission(high_risk, degraded)
+        finally:
+            elapsed = time.perf_counter() - started
+            async with cond:
+                self.in_flight -= 1
+                self.latency_ewma += self.ewma_alpha * (elapsed - self.latency_ewma)
+                cond.notify_all()
+
+    def stats(self) -> Dict:
+        return {
+            'in_flight': self.in_flight,
+            'waiting_high_risk': self.waiting['high'],
+            'waiting_low_risk': self.waiting['low'],
+            'latency_ewma_seconds': round(self.latency_ewma, 3),
+            'degraded': self.degraded_count,
+            'shed': self.shed_count,
+            'rate_limited': self.rate_limited_count
+        }
@@ -1,37 +1,208 @@
+import time
+
+# Measured from the first line so the startup budget includes all imports
+_IMPORT_STARTED = time.perf_counter()
+
+import asyncio
 import os
-import openai
-import numpy as np
-from typing import Dict, List, Tuple, Optional, Any
-from pydantic import BaseModel, Field, validator, HttpUrl
-from fastapi import FastAPI, HTTPException, Request, Depends, status, BackgroundTasks
+from contextlib import asynccontextmanager
+from typing import Dict, List, Literal, Tuple, Optional, Any, Union
+from pydantic import BaseModel, Field, ValidationInfo, field_validator, HttpUrl
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from fastapi import FastAPI, HTTPException, Request, Depends, Query, status, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi.encoders import jsonable_encoder
 import logging
-import time
 from functools import lru_cache, wraps
 from datetime import datetime, timedelta
 import json
 import hashlib
-import redis
-from ratelimit import limits, sleep_and_retry
-from tenacity import retry, stop_after_attempt, wait_exponential
-import sentry_sdk
-from prometheus_fastapi_instrumentator import Instrumentator
 from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
-from motor.motor_asyncio import AsyncIOMotorClient
-from pymongo import MongoClient, ASCENDING, DESCENDING
 import uuid
 
+from admission import AdmissionController, Overloaded, RateLimited, TokenBucket
+from job_queue import JobWorkerPool, RedisStreamJobQueue, SQLiteJobQueue
+from priority_index import PriorityIndex, RedisPriorityIndex
+from result_cache import content_key
+from rescoring import CLOSED_STATUSES, RedisRescoringEngine, RescoringEngine
+from text_normalization import NormalizedText, as_normalized, normalize_text
+
+# Heavy clients (openai, redis, motor, sentry_sdk) are imported and connected
+# in the lifespan hook below, so importing this module does no network I/O.
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Load environment variables with validation
+class Settings(BaseSettings):
+    OPENAI_API_KEY: Optional[str] = None
+    REDIS_URL: str = 'redis://localhost:6379/0'
+    MONGODB_URI: str = 'mongodb://localhost:27017'
+    RATE_LIMIT: int = 60  # low-risk danger-score requests per minute
+    HIGH_RISK_RATE_LIMIT: int = 600  # high-risk danger-score requests per minute
+    CACHE_TTL: int = 3600  # 1 hour cache
+    ENVIRONMENT: str = 'development'
+    SENTRY_DSN: Optional[str] = None
+    ENABLE_METRICS: bool = True
+    CONNECT_TIMEOUT: float = 2.0  # seconds, per dependency
+    STARTUP_BUDGET_SECONDS: float = 3.0
+    # Admission control for /api/ai/danger-score
+    ADMISSION_MAX_CONCURRENCY: int = 16
+    ADMISSION_HIGH_RISK_RESERVE: int = 4
+    ADMISSION_DEGRADE_QUEUE: int = 8
+    ADMISSION_SHED_QUEUE: int = 64
+    ADMISSION_DEGRADE_LATENCY: float = 2.0  # seconds
+    ADMISSION_SHED_LATENCY: float = 8.0  # seconds
+    # Local classifier trained offline from feedback (see local_classifier.py)
+    LOCAL_MODEL_PATH: str = 'local_model.npz'
+    LOCAL_MODEL_CONFIDENCE: float = 0.85  # below this, ask the LLM
+    FEEDBACK_PATH: str = 'feedback.jsonl'
+    JOB_WORKERS: int = 4  # concurrent async analysis jobs per process
+    JOB_QUEUE_PATH: str = 'ai_jobs.db'  # SQLite fallback without Redis
+    JOB_STALE_SECONDS: float = 300.0  # claimed jobs unfinished after this long are requeued
+    JOB_CALLBACK_PREFIXES: str = ''  # comma-separated URL prefixes callbacks may target; empty disables callbacks
+    PREWARM_RATE_LIMIT: int = 60  # LLM-backed cache misses per minute during a pre-warm
+    PREWARM_CONCURRENCY: int = 4  # complaints pre-warmed at once
+
+    model_config = SettingsConfigDict(env_file='.env', env_file_encoding='utf-8', extra='ignore')
+
+# Initialize settings
+settings = Settings()
+
+# Populated by the lifespan hook; every caller must handle None
+mongo_client = None
+redis_client = None
+# Same Redis as redis_client, without decoding: cached response bodies stay bytes
+cache_client = None
+
+def capture_exception(e: Exception) -> None:
+    """Report an exception to Sentry when it is configured."""
+    if settings.SENTRY_DSN:
+        import sentry_sdk
+        sentry_sdk.capture_exception(e)
+
+def init_sentry() -> None:
+    if not settings.SENTRY_DSN:
+        return
+    import sentry_sdk
+    sentry_sdk.init(
+        dsn=settings.SENTRY_DSN,
+        environment=settings.ENVIRONMENT,
+        traces_sample_rate=1.0,
+        profiles_sample_rate=1.0,
+    )
+
+def redis_from_url(decode_responses: bool = True):
+    import redis
+    return redis.Redis.from_url(
+        settings.REDIS_URL,
+        decode_responses=decode_responses,
+        socket_connect_timeout=settings.CONNECT_TIMEOUT,
+        socket_timeout=settings.CONNECT_TIMEOUT
+    )
+
+async def init_redis():
+    """Connect to Redis, returning None (in-memory mode) if it is unreachable."""
+    client = redis_from_url()
+    try:
+        await asyncio.wait_for(asyncio.to_thread(client.ping), timeout=settings.CONNECT_TIMEOUT)
+        return client
+    except Exception as e:
+        logger.warning(f"Redis connection failed: {e}. Using in-memory cache.")
+        return None
+
+async def init_mongo():
+    """Connect to MongoDB, returning None if it is unreachable outside production."""
+    if settings.ENVIRONMENT == 'test':
+        return None
+    from motor.motor_asyncio import AsyncIOMotorClient
+    client = AsyncIOMotorClient(
+        settings.MONGODB_URI,
+        serverSelectionTimeoutMS=int(settings.CONNECT_TIMEOUT * 1000)
+    )
+    try:
+        await asyncio.wait_for(client.admin.command('ping'), timeout=settings.CONNECT_TIMEOUT)
+        logger.info("Connected to MongoDB")
+        return client
+    except Exception as e:
+        logger.error(f"Failed to connect to MongoDB: {e}")
+        client.close()
+        if settings.ENVIRONMENT == 'production':
+            raise
+        return None
+
+def load_local_model():
+    """Load the feedback-trained classifier if one has been trained (imports numpy lazily)."""
+    if not os.path.exists(settings.LOCAL_MODEL_PATH):
+        logger.info("No local classifier found; every analysis may use the LLM")
+        return None
+    try:
+        from local_classifier import LocalModel
+        model = LocalModel.load(settings.LOCAL_MODEL_PATH)
+        logger.info(f"Loaded local classifier version {model.version}")
+        return model
+    except Exception as e:
+        logger.error(f"Failed to load local classifier: {e}")
+        return None
+
+def get_openai_client():
+    """Create the OpenAI client if an API key is configured (no network call)."""
+    if not settings.OPENAI_API_KEY:
+        logger.warning("OPENAI_API_KEY is not configured; using rule-based analysis only")
+        return None
+    from openai import AsyncOpenAI
+    return AsyncOpenAI(api_key=settings.OPENAI_API_KEY, timeout=10.0)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Connect external dependencies with timeouts and check the startup budget."""
+    global mongo_client, redis_client, cache_client, rescoring_engine, priority_index
+
+    started = time.perf_counter()
+    init_sentry()
+    app.state.openai_client = get_openai_client()
+    app.state.local_model = load_local_model()
+    redis_client, mongo_client = await asyncio.gather(init_redis(), init_mongo())
+    if redis_client:
+        cache_client = redis_from_url(decode_responses=False)
+        # Shared by every worker process and replica
+        rescoring_engine = RedisRescoringEngine(redis_client)
+        priority_index = RedisPriorityIndex(redis_client)
+    else:
+        logger.warning("Priority state is held in process memory; run a single worker without Redis")
+    app.state.job_pool = start_job_pool()
+
+    app.state.startup_timings = {
+        "import_seconds": round(_IMPORT_DURATION, 3),
+        "lifespan_seconds": round(time.perf_counter() - started, 3),
+        "budget_seconds": settings.STARTUP_BUDGET_SECONDS
+    }
+    total = app.state.startup_timings["import_seconds"] + app.state.startup_timings["lifespan_seconds"]
+    if total > settings.STARTUP_BUDGET_SECONDS:
+        logger.warning(f"Startup took {total:.2f}s, over the {settings.STARTUP_BUDGET_SECONDS}s budget")
+    else:
+        logger.info(f"Startup took {total:.2f}s")
+
+    yield
+
+    if app.state.job_pool:
+        await app.state.job_pool.stop()
+        app.state.job_pool.queue.close()
+    if mongo_client:
+        mongo_client.close()
+    if redis_client:
+        redis_client.close()
+    if cache_client:
+        cache_client.close()
+
 # Initialize FastAPI app
 app = FastAPI(
     title="JANMITRA AI Service",
     description="AI-powered features for JANMITRA including danger scoring and auto-descriptions",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -43,120 +214,106 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Load environment variables with validation
-class Settings(BaseModel):
-    OPENAI_API_KEY: str = Field(..., env='OPENAI_API_KEY')
-    REDIS_URL: str = Field('redis://localhost:6379/0', env='REDIS_URL')
-    RATE_LIMIT: int = Field(60, env='RATE_LIMIT')  # requests per minute
-    CACHE_TTL: int = Field(3600, env='CACHE_TTL')  # 1 hour cache
-    ENVIRONMENT: str = Field('development', env='ENVIRONMENT')
-    SENTRY_DSN: Optional[str] = Field(None, env='SENTRY_DSN')
-    
-    class Config:
-        env_file = '.env'
-        env_file_encoding = 'utf-8'
+# Bump whenever HIGH_RISK_KEYWORDS, CATEGORY_RISK_SCORES or the scoring
+# formulas change so that stale cached results are never served
+SCORING_RULES_VERSION = '4'
+LLM_MODEL = "gpt-3.5-turbo"
 
-# Initialize settings
-settings = Settings()
+def cache_namespace(use_llm: bool = True) -> str:
+    """Cache key prefix tied to the scoring rules and the model in use."""
+    engine = LLM_MODEL if use_llm and getattr(app.state, 'openai_client', None) else 'rules'
+    local_model = getattr(app.state, 'local_model', None)
+    if local_model:
+        engine = f"{engine}+local{local_model.version}"
+    return f"ai_cache:v{SCORING_RULES_VERSION}:{engine}"
 
-# Initialize MongoDB client
-mongo_client = None
-if settings.ENVIRONMENT != 'test':
-    try:
-        mongo_client = AsyncIOMotorClient(os.getenv("MONGODB_URI", "mongodb://localhost:27017"))
-        db = mongo_client.get_database("ai_service")
-        logger.info("Connected to MongoDB")
-    except Exception as e:
-        logger.error(f"Failed to connect to MongoDB: {e}")
-        if settings.ENVIRONMENT == 'production':
-            raise
-
-# Initialize Sentry for error tracking
-if settings.SENTRY_DSN:
-    sentry_sdk.init(
-        dsn=settings.SENTRY_DSN,
-        environment=settings.ENVIRONMENT,
-        traces_sample_rate=1.0,
-        profiles_sample_rate=1.0,
+def complaint_cache_key(feature: str, complaint: "ComplaintData", use_llm: bool = True) -> str:
+    """
+    Canonical cache key built only from the complaint fields that affect AI
+    results, so equivalent complaints share an entry regardless of location,
+    upvotes or request metadata.
+    """
+    normalized = normalize_text(complaint.description, complaint.language)
+    digest = content_key(
+        normalized.text,
+        complaint.category.lower(),
+        complaint.media_type or '',
+        normalized.language
     )
+    return f"{cache_namespace(use_llm)}:{feature}:{digest}"
 
-# Initialize Redis for caching
-redis_client = None
 try:
-    redis_client = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
-    redis_client.ping()
-except Exception as e:
-    logger.warning(f"Redis connection failed: {e}. Using in-memory cache.")
-    redis_client = None
+    import orjson  # Optional: several times faster than json for responses
+except ImportError:
+    orjson = None
+
+def encode_json(obj: Any) -> bytes:
+    """Serialize plain (already jsonable) data to compact JSON bytes."""
+    if orjson:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+def decode_json(data) -> Any:
+    if orjson:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def json_bytes_response(body: bytes) -> Response:
+    """Return pre-encoded JSON as-is, bypassing response_model validation and re-encoding."""
+    return Response(content=body, media_type="application/json")
 
 # Cache decorator with Redis fallback
-def cache_response(ttl: int = 3600):
+def cache_response(feature: str, model: type, ttl: int = 3600):
+    """
+    Cache an `async def f(complaint) -> model` in Redis under its canonical
+    complaint key, storing the encoded JSON so hits need no re-serialization.
+    Reads go through `cache_client`, which does not decode, so a hit is the
+    stored bytes. Error fallbacks (confidence 0) are not cached.
+
+    The decorated function returns model instances. `f.raw(...)` returns
+    `(body, result)` instead: the JSON bytes, plus the model on a miss (None
+    on a cache hit, where nothing is decoded).
+    """
     def decorator(func):
-        @wraps(func)
-        async def wrapper(*args, **kwargs):
-            if not redis_client:
-                return await func(*args, **kwargs)
+        async def raw(complaint, *args, **kwargs):
+            if not cache_client:
+                result = await func(complaint, *args, **kwargs)
+                return encode_json(result.model_dump()), result
                 
-            # Create a cache key from function name and arguments
-            cache_key = f"ai_cache:{func.__name__}:{hashlib.md5(str(args[1:]).encode()).hexdigest()}"
+            cache_key = complaint_cache_key(feature, complaint, kwargs.get('use_llm', True))
             
             # Try to get cached result
-            cached_result = redis_client.get(cache_key)
+            try:
+                cached_result = cache_client.get(cache_key)
+            except Exception as e:
+                logger.warning(f"Cache read failed for {cache_key}: {e}")
+                cached_result = None
             if cached_result:
                 logger.debug(f"Cache hit for {cache_key}")
-                return json.loads(cached_result)
+                return cached_result, None
                 
-            # Call the function and cache the result
-            result = await func(*args, **kwargs)
-            if result is not None:
-                redis_client.setex(cache_key, ttl, json.dumps(jsonable_encoder(result)))
+            # Call the function, encode once and cache the bytes
+            result = await func(complaint, *args, **kwargs)
+            body = encode_json(result.model_dump())
+            if result.confidence > 0:
+                try:
+                    cache_client.setex(cache_key, ttl, body)
+                except Exception as e:
+                    logger.warning(f"Cache write failed for {cache_key}: {e}")
+            return body, result
+
+        @wraps(func)
+        async def wrapper(complaint, *args, **kwargs):
+            body, result = await raw(complaint, *args, **kwargs)
+            if result is None:
+                # Written by this service from a valid model; skip re-validation
+                result = model.model_construct(**decode_json(body))
             return result
             
+        wrapper.raw = raw
         return wrapper
     return decorator
 
-# Rate limiting decorator
-RATE_LIMIT = settings.RATE_LIMIT
-ONE_MINUTE = 60
-
-@sleep_and_retry
-@limits(calls=RATE_LIMIT, period=ONE_MINUTE)
-def check_rate_limit():
-    """Raises an exception if the rate limit is exceeded"""
-    return True
-
-# Initialize OpenAI client with retry mechanism
-@retry(
-    stop=stop_after_attempt(3),
-    wait=wait_exponential(multiplier=1, min=4, max=10),
-    reraise=True
-)
-async def get_openai_client():
-    if not settings.OPENAI_API_KEY:
-        raise ValueError("OPENAI_API_KEY is not configured")
-    
-    try:
-        client = OpenAI(api_key=settings.OPENAI_API_KEY)
-        # Test the connection
-        client.models.list()
-        logger.info("Successfully connected to OpenAI API")
-        return client
-    except Exception as e:
-        logger.error(f"Failed to initialize OpenAI client: {e}")
-        raise
-
-# Initialize on startup
-@app.on_event("startup")
-async def startup_event():
-    try:
-        app.state.openai_client = await get_openai_client()
-        # Initialize metrics
-        Instrumentator().instrument(app).expose(app)
-    except Exception as e:
-        logger.error(f"Startup error: {e}")
-        if settings.ENVIRONMENT != 'development':
-            raise
-
 # Models
 class LocationData(BaseModel):
     """Location data model with validation."""
@@ -165,11 +322,12 @@ class LocationData(BaseModel):
     address: Optional[str] = None
     accuracy: Optional[float] = Field(None, ge=0, description="Accuracy in meters")
     
-    @validator('lat', 'lng')
-    def validate_coordinates(cls, v, field):
-        if field.name == 'lat' and not -90 <= v <= 90:
+    @field_validator('lat', 'lng')
+    @classmethod
+    def validate_coordinates(cls, v, info: ValidationInfo):
+        if info.field_name == 'lat' and not -90 <= v <= 90:
             raise ValueError('Latitude must be between -90 and 90')
-        if field.name == 'lng' and not -180 <= v <= 180:
+        if info.field_name == 'lng' and not -180 <= v <= 180:
             raise ValueError('Longitude must be between -180 and 180')
         return v
 
@@ -180,7 +338,7 @@ class ComplaintData(BaseModel):
     location: LocationData
     media_type: Optional[str] = Field(
         None, 
-        regex='^(image|video|audio|document|none)$',
+        pattern='^(image|video|audio|document|none)$',
         description="Type of media attached to the complaint"
     )
     media_count: int = Field(0, ge=0, le=10, description="Number of media files (0-10)")
@@ -195,8 +353,14 @@ class ComplaintData(BaseModel):
     )
     language: str = Field("en", min_length=2, max_length=2, description="ISO 639-1 language code")
     
-    class Config:
-        schema_extra = {
+    @field_validator('category', mode='before')
+    @classmethod
+    def strip_category(cls, v):
+        # The cache key and the scorers must see the same category
+        return v.strip() if isinstance(v, str) else v
+    
+    model_config = {
+        "json_schema_extra": {
             "example": {
                 "description": "There's a large pothole causing traffic issues",
                 "category": "Roads",
@@ -210,6 +374,7 @@ class ComplaintData(BaseModel):
                 "language": "en"
             }
         }
+    }
 
 class DangerScoreResponse(BaseModel):
     """Response model for danger score calculation."""
@@ -229,9 +394,83 @@ class FeedbackRequest(BaseModel):
     complaint_id: str
     feedback_type: str  # 'positive', 'negative', 'correction'
     message: Optional[str] = None
-    corrections: Optional[Dict[str, Any]] = None
+    corrections: Optional[Dict[str, Any]] = None  # e.g. {'category': ..., 'risk_level': ...}
     user_id: Optional[str] = None
     session_id: Optional[str] = None  # 0-1
+    # The analysed complaint and the labels it was given, used as training data
+    description: Optional[str] = Field(None, max_length=5000)
+    language: str = Field("en", min_length=2, max_length=2)
+    category: Optional[str] = None
+    risk_level: Optional[str] = None
+
+class ComplaintEvent(BaseModel):
+    """A change to an already scored complaint."""
+    complaint_id: str
+    type: Literal['created', 'upvote', 'media_added', 'status_change', 'user_history'] = Field(
+        ..., description="Kind of change"
+    )
+    delta: int = Field(1, description="Increment for upvote/media_added when no absolute count is given")
+    upvotes: Optional[int] = Field(None, ge=0)
+    media_count: Optional[int] = Field(None, ge=0)
+    status: Optional[str] = None
+    previous_complaints: Optional[int] = Field(None, ge=0)
+    # Only used by 'created' events
+    danger_score: Optional[float] = None
+    risk_level: Optional[str] = None
+    category: Optional[str] = None
+    ward: Optional[str] = None
+
+class ComplaintEventBatch(BaseModel):
+    """Batch of complaint change events."""
+    events: List[ComplaintEvent] = Field(..., max_length=1000)
+
+class PriorityUpdate(BaseModel):
+    """Current priority of a complaint after applying events."""
+    complaint_id: str
+    priority: int  # 0-100, same scale as backend calculatePriority
+    danger_score: float
+    risk_level: str
+    category: str
+    ward: Optional[str] = None
+    status: str
+
+class PriorityUpdateBatch(BaseModel):
+    """Bulk priority updates produced by a batch of events."""
+    updates: List[PriorityUpdate]
+    skipped: int = 0  # Events for complaints that were never scored
+
+class JobSubmission(BaseModel):
+    """Request to run an analysis asynchronously."""
+    type: Literal['danger_score', 'auto_description']
+    complaint: ComplaintData
+    callback_url: Optional[str] = Field(None, description="POSTed the job status once it finishes")
+
+class JobStatusResponse(BaseModel):
+    """State of an asynchronous analysis job."""
+    job_id: str
+    type: str
+    status: str  # 'queued', 'running', 'done', 'failed'
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    attempts: int = 0
+    created_at: float
+    updated_at: float
+
+class PrewarmRequest(BaseModel):
+    """Open complaints whose AI results should be cached ahead of traffic."""
+    complaints: List[ComplaintData] = Field(..., max_length=10000)
+    features: List[str] = Field(["danger_score"], description="'danger_score' and/or 'auto_description'")
+
+class RankedComplaint(BaseModel):
+    """A complaint in a top-K triage list."""
+    complaint_id: str
+    score: float
+
+class TopComplaintsResponse(BaseModel):
+    """Most dangerous open complaints for a ward and/or category."""
+    ward: Optional[str] = None
+    category: Optional[str] = None
+    complaints: List[RankedComplaint]
 
 # Constants
 RISK_LEVELS = {
@@ -266,6 +505,25 @@ CATEGORY_RISK_SCORES = {
     'other': 3.0
 }
 
+# Incremental priority state, fed by danger scoring and change events. Both
+# are replaced by their Redis-backed versions at startup when Redis is up
+rescoring_engine = RescoringEngine()
+
+# Priority lanes and load shedding for danger scoring
+admission_controller = AdmissionController(
+    max_concurrency=settings.ADMISSION_MAX_CONCURRENCY,
+    high_risk_reserve=settings.ADMISSION_HIGH_RISK_RESERVE,
+    degrade_queue=settings.ADMISSION_DEGRADE_QUEUE,
+    shed_queue=settings.ADMISSION_SHED_QUEUE,
+    degrade_latency=settings.ADMISSION_DEGRADE_LATENCY,
+    shed_latency=settings.ADMISSION_SHED_LATENCY,
+    low_risk_rate=settings.RATE_LIMIT,
+    high_risk_rate=settings.HIGH_RISK_RATE_LIMIT
+)
+
+# Open complaints ranked by danger score per ward/category for triage views
+priority_index = PriorityIndex()
+
 # Utility functions
 def get_risk_level(score: float) -> str:
     """Convert a score to a risk level."""
@@ -274,49 +532,121 @@ def get_risk_level(score: float) -> str:
             return level
     return 'low'
 
-def contains_high_risk_keywords(text: str) -> Tuple[bool, List[str]]:
-    """Check if text contains high-risk keywords."""
+def contains_high_risk_keywords(text: Union[str, NormalizedText], language: str = 'en') -> Tuple[bool, List[str]]:
+    """Check if text (raw or normalized) contains high-risk keywords."""
     if not text:
         return False, []
     
-    text_lower = text.lower()
+    text_lower = as_normalized(text, language).text
     found_keywords = [kw for kw in HIGH_RISK_KEYWORDS if kw in text_lower]
     return len(found_keywords) > 0, found_keywords
 
+def track_scored_complaint(complaint: ComplaintData, result: DangerScoreResponse) -> None:
+    """Record a scored complaint for incremental re-scoring if it carries an id."""
+    context = complaint.additional_context or {}
+    complaint_id = context.get('complaint_id')
+    if not complaint_id:
+        return
+    history = complaint.user_history or {}
+    record = rescoring_engine.upsert(
+        str(complaint_id),
+        danger_score=result.score,
+        risk_level=result.risk_level,
+        category=complaint.category,
+        ward=context.get('ward'),
+        upvotes=complaint.upvotes,
+        media_count=complaint.media_count,
+        previous_complaints=history.get('previous_complaints')
+    )
+    # A closed complaint keeps its status, so re-scoring it must not re-index it
+    updates = rescoring_engine.updates_for([record])
+    sync_priority_index(updates)
+    publish_priority_updates(updates)
+
+def publish_priority_updates(updates: List[Dict[str, Any]]) -> None:
+    """Publish priority updates to the `ai:priority_updates` Redis channel."""
+    if not redis_client or not updates:
+        return
+    try:
+        redis_client.publish("ai:priority_updates", json.dumps(updates))
+    except Exception as e:
+        logger.warning(f"Failed to publish priority updates: {e}")
+
+def apply_complaint_changes(events: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int]:
+    """Apply events, sync the triage index and publish; returns (updates, skipped)."""
+    touched = rescoring_engine.apply_many(events)
+    skipped = len({e['complaint_id'] for e in events}) - len(touched)
+    updates = rescoring_engine.updates_for(touched)
+    sync_priority_index(updates)
+    publish_priority_updates(updates)
+    return updates, skipped
+
+async def run_priority_io(func, *args):
+    """
+    Run rescoring/priority index work off the event loop when it goes to
+    Redis. The in-memory versions are only ever touched from the event loop.
+    """
+    if redis_client:
+        return await asyncio.to_thread(func, *args)
+    return func(*args)
+
+def sync_priority_index(updates: List[Dict[str, Any]]) -> None:
+    """Reflect re-scored complaints in the triage index, dropping closed ones."""
+    for update in updates:
+        if update['status'] in CLOSED_STATUSES:
+            priority_index.remove(update['complaint_id'])
+        else:
+            priority_index.update(
+                update['complaint_id'], update['danger_score'], update['ward'], update['category']
+            )
+
 # AI Functions
-async def generate_danger_score(complaint: ComplaintData) -> DangerScoreResponse:
+@cache_response("danger_score", DangerScoreResponse, ttl=settings.CACHE_TTL)
+async def generate_danger_score(complaint: ComplaintData, use_llm: bool = True) -> DangerScoreResponse:
     """
     Generate a danger score for a complaint using a combination of rule-based and AI analysis.
     
     Args:
         complaint: The complaint data including description, category, etc.
+        use_llm: Set to False to skip the LLM call (e.g. when degraded under load)
         
     Returns:
         DangerScoreResponse with score, risk level, and factors
     """
     try:
-        # Base score from category
-        base_score = CATEGORY_RISK_SCORES.get(complaint.category.lower(), 30)
+        # Normalize once (language-aware) and reuse for every rule below
+        normalized = normalize_text(complaint.description, complaint.language)
+        local_model = getattr(app.state, 'local_model', None)
+        
+        # Base score from category, asking the local classifier when the
+        # reported category is unknown
+        category = complaint.category.lower()
+        predicted_category = None
+        if category not in CATEGORY_RISK_SCORES and local_model:
+            prediction = local_model.predict(normalized, 'category')
+            if prediction and prediction[0] in CATEGORY_RISK_SCORES and prediction[1] >= settings.LOCAL_MODEL_CONFIDENCE:
+                predicted_category = category = prediction[0]
+        base_score = CATEGORY_RISK_SCORES.get(category, CATEGORY_RISK_SCORES['other'])
         
         # Check for high-risk keywords
-        has_high_risk, found_keywords = contains_high_risk_keywords(complaint.description)
+        has_high_risk, found_keywords = contains_high_risk_keywords(normalized)
         
         # Adjust score based on high-risk keywords
         keyword_adjustment = 0
         if has_high_risk:
-            keyword_adjustment = 20
+            keyword_adjustment = 2.0
             if len(found_keywords) > 2:  # Multiple high-risk keywords
-                keyword_adjustment = 30
+                keyword_adjustment = 3.0
         
         # Adjust based on media type
         media_adjustment = 0
         if complaint.media_type == 'video':
-            media_adjustment = 10
+            media_adjustment = 1.0
         elif complaint.media_type == 'image':
-            media_adjustment = 5
+            media_adjustment = 0.5
         
-        # Calculate final score (clamped between 0-100)
-        final_score = min(100, max(0, base_score + keyword_adjustment + media_adjustment))
+        # Calculate final score on the 0-10 scale of CATEGORY_RISK_SCORES and RISK_LEVELS
+        final_score = round(min(10.0, max(0.0, base_score + keyword_adjustment + media_adjustment)), 1)
         
         # Generate factors
         factors = []
@@ -324,12 +654,28 @@ async def generate_danger_score(complaint: ComplaintData) -> DangerScoreResponse
             factors.append(f"High-risk keywords detected: {', '.join(found_keywords)}")
         if complaint.media_type:
             factors.append(f"Includes {complaint.media_type} media")
+        if predicted_category:
+            factors.append(f"Category inferred by local model: {predicted_category}")
+        
+        risk_level = get_risk_level(final_score)
+        
+        # A confident local classifier stands in for the LLM assessment: it sets
+        # the risk level, and the score is moved into that level's range
+        openai_client = getattr(app.state, 'openai_client', None) if use_llm else None
+        if local_model:
+            prediction = local_model.predict(normalized, 'risk_level')
+            if prediction and prediction[0] in RISK_LEVELS and prediction[1] >= settings.LOCAL_MODEL_CONFIDENCE:
+                risk_level = prediction[0]
+                low, high = RISK_LEVELS[risk_level]
+                final_score = min(high, max(low, final_score))
+                factors.append(f"Local model assessment: {risk_level} risk ({prediction[1]:.2f})")
+                openai_client = None
         
         # Add AI analysis if available
-        if OPENAI_API_KEY:
+        if openai_client:
             try:
-                response = await openai.ChatCompletion.acreate(
-                    model="gpt-3.5-turbo",
+                response = await openai_client.chat.completions.create(
+                    model=LLM_MODEL,
                     messages=[
                         {"role": "system", "content": "You are a risk assessment AI. Analyze the following complaint and provide a brief risk assessment. Focus on potential danger to public safety, health hazards, and urgency."},
                         {"role": "user", "content": f"Complaint: {complaint.description}\n\nCategory: {complaint.category}"}
@@ -344,7 +690,7 @@ async def generate_danger_score(complaint: ComplaintData) -> DangerScoreResponse
         
         return DangerScoreResponse(
             score=final_score,
-            risk_level=get_risk_level(final_score),
+            risk_level=risk_level,
             factors=factors,
             confidence=0.8
         )
@@ -358,6 +704,7 @@ async def generate_danger_score(complaint: ComplaintData) -> DangerScoreResponse
             confidence=0.0
         )
 
+@cache_response("auto_description", AutoDescriptionResponse, ttl=settings.CACHE_TTL)
 async def generate_auto_description(complaint: ComplaintData) -> AutoDescriptionResponse:
     """
     Generate a concise, informative description from the complaint data.
@@ -370,10 +717,11 @@ async def generate_auto_description(complaint: ComplaintData) -> AutoDescription
     """
     try:
         # If we have an API key, use GPT for better descriptions
-        if OPENAI_API_KEY:
+        openai_client = getattr(app.state, 'openai_client', None)
+        if openai_client:
             try:
-                response = await openai.ChatCompletion.acreate(
-                    model="gpt-3.5-turbo",
+                response = await openai_client.chat.completions.create(
+                    model=LLM_MODEL,
                     messages=[
                         {"role": "system", "content": "You are a helpful assistant that generates concise, informative descriptions for citizen complaints. Create a 7-10 word description that captures the key issue. Also extract 3-5 keywords."},
                         {"role": "user", "content": f"Complaint: {complaint.description}\n\nCategory: {complaint.category}"}
@@ -399,7 +747,7 @@ async def generate_auto_description(complaint: ComplaintData) -> AutoDescription
                 
                 # If no keywords found, generate some from the description
                 if not keywords:
-                    keywords = list(set(complaint.description.lower().split()))
+                    keywords = list(dict.fromkeys(normalize_text(complaint.description, complaint.language).surface_words))
                     keywords = [k for k in keywords if len(k) > 3][:5]
                 
                 return AutoDescriptionResponse(
@@ -411,16 +759,17 @@ async def generate_auto_description(complaint: ComplaintData) -> AutoDescription
                 logger.error(f"Error calling OpenAI for description: {str(e)}")
         
         # Fallback to simple rule-based description
+        normalized = normalize_text(complaint.description, complaint.language)
         category = complaint.category.replace('_', ' ').title()
-        has_urgent = any(word in complaint.description.lower() for word in ['urgent', 'emergency', 'immediate', 'help'])
+        has_urgent = any(word in normalized.text for word in ['urgent', 'emergency', 'immediate', 'help'])
         
         if has_urgent:
             description = f"Urgent: {category} issue requires immediate attention"
         else:
             description = f"{category} issue reported"
         
-        # Generate simple keywords
-        words = [w.lower() for w in complaint.description.split() if len(w) > 3]
+        # Generate simple keywords from the words as written (stems are only for matching)
+        words = [w for w in normalized.surface_words if len(w) > 3]
         word_freq = {}
         for word in words:
             word_freq[word] = word_freq.get(word, 0) + 1
@@ -444,72 +793,267 @@ async def generate_auto_description(complaint: ComplaintData) -> AutoDescription
 
 # API Endpoints
 @app.post("/api/ai/danger-score", response_model=DangerScoreResponse)
-@cache_response(ttl=3600)  # Cache for 1 hour
 async def get_danger_score(
     request: Request,
     complaint: ComplaintData,
     background_tasks: BackgroundTasks
-) -> DangerScoreResponse:
+) -> Response:
     """
     Calculate a danger score for a complaint with rate limiting and caching.
+    
+    Complaints mentioning high-risk keywords take the priority lane, which has
+    reserved capacity and a larger rate limit (HIGH_RISK_RATE_LIMIT vs
+    RATE_LIMIT). A lane over its rate limit gets 429; low-risk complaints are
+    answered rule-based only or rejected with 503 when the service is
+    overloaded. Nothing here blocks the event loop.
     """
+    high_risk, _ = contains_high_risk_keywords(normalize_text(complaint.description, complaint.language))
     try:
-        # Check rate limit
-        check_rate_limit()
-        
-        # Generate a cache key
-        cache_key = f"danger_score:{hashlib.md5(json.dumps(complaint.dict()).encode()).hexdigest()}"
-        
-        # Log the request for monitoring
-        logger.info(f"Danger score request: {complaint.category} in {complaint.location}")
-        
-        # Process in background if it's a heavy operation
-        if len(complaint.description) > 1000:  # Large text processing
-            background_tasks.add_task(
-                log_ai_usage,
-                feature="danger_score",
-                input_data=complaint.dict(),
-                user_agent=request.headers.get('user-agent')
-            )
-        
-        # Generate the score
-        result = await generate_danger_score(complaint)
-        
-        # Update cache asynchronously
-        if redis_client:
-            background_tasks.add_task(
-                redis_client.setex,
-                cache_key,
-                settings.CACHE_TTL,
-                json.dumps(jsonable_encoder(result))
-            )
-            
-        return result
+        async with admission_controller.admit(high_risk) as admission:
+            return await score_admitted_complaint(request, complaint, background_tasks, admission.degraded)
         
+    except RateLimited as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except Overloaded as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
     except Exception as e:
         logger.error(f"Error in get_danger_score: {e}", exc_info=True)
-        if settings.SENTRY_DSN:
-            sentry_sdk.capture_exception(e)
+        capture_exception(e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to generate danger score: {str(e)}"
         )
 
+async def score_admitted_complaint(
+    request: Request,
+    complaint: ComplaintData,
+    background_tasks: BackgroundTasks,
+    degraded: bool
+) -> Response:
+    """Score a complaint that has passed admission control."""
+    # Log the request for monitoring
+    logger.info(f"Danger score request: {complaint.category} in {complaint.location}")
+    
+    # Process in background if it's a heavy operation
+    if len(complaint.description) > 1000:  # Large text processing
+        background_tasks.add_task(
+            log_ai_usage,
+            feature="danger_score",
+            input_data=complaint.model_dump(),
+            user_agent=request.headers.get('user-agent')
+        )
+    
+    # Generate the score; warm cache hits come back as ready-to-send bytes
+    body, result = await generate_danger_score.raw(complaint, use_llm=not degraded)
+    tracked = bool((complaint.additional_context or {}).get('complaint_id'))
+    if result is None and (degraded or tracked):
+        result = DangerScoreResponse.model_construct(**decode_json(body))
+    if degraded:
+        result.factors.append("Rule-based only: AI analysis skipped under high load")
+        body = encode_json(result.model_dump())
+    if tracked:
+        await run_priority_io(track_scored_complaint, complaint, result)
+        
+    return json_bytes_response(body)
+
 @app.post("/api/ai/auto-description", response_model=AutoDescriptionResponse)
 async def get_auto_description(complaint: ComplaintData):
     """
     Generate an automatic description for a complaint.
     """
     try:
-        return await generate_auto_description(complaint)
+        body, _ = await generate_auto_description.raw(complaint)
+        return json_bytes_response(body)
     except Exception as e:
         logger.error(f"Error in /api/ai/auto-description: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# Asynchronous analysis jobs
+async def run_danger_score_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    complaint = ComplaintData(**payload)
+    result = await generate_danger_score(complaint)
+    await run_priority_io(track_scored_complaint, complaint, result)
+    return result.model_dump()
+
+async def run_auto_description_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    result = await generate_auto_description(ComplaintData(**payload))
+    return result.model_dump()
+
+def start_job_pool() -> Optional[JobWorkerPool]:
+    """Start the job workers on Redis Streams, or a local SQLite queue without Redis."""
+    if settings.JOB_WORKERS <= 0:
+        return None
+    if redis_client:
+        queue = RedisStreamJobQueue(redis_client)
+    else:
+        queue = SQLiteJobQueue(settings.JOB_QUEUE_PATH)
+    pool = JobWorkerPool(
+        queue,
+        handlers={
+            "danger_score": run_danger_score_job,
+            "auto_description": run_auto_description_job
+        },
+        concurrency=settings.JOB_WORKERS,
+        callback_prefixes=[p.strip() for p in settings.JOB_CALLBACK_PREFIXES.split(',')],
+        stale_seconds=settings.JOB_STALE_SECONDS
+    )
+    pool.start()
+    return pool
+
+@app.post("/api/ai/jobs", response_model=JobStatusResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_job(submission: JobSubmission) -> JobStatusResponse:
+    """
+    Queue an analysis and return immediately; poll `GET /api/ai/jobs/{job_id}`
+    or pass `callback_url` (under one of JOB_CALLBACK_PREFIXES) to be notified
+    when it completes.
+    """
+    pool = getattr(app.state, 'job_pool', None)
+    if not pool:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Job queue is disabled")
+    try:
+        job = await asyncio.to_thread(
+            pool.submit, submission.type, jsonable_encoder(submission.complaint), submission.callback_url
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return JobStatusResponse(**job)
+
+@app.get("/api/ai/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_job(job_id: str) -> JobStatusResponse:
+    """Return the status (and result, once done) of an analysis job."""
+    pool = getattr(app.state, 'job_pool', None)
+    if not pool:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Job queue is disabled")
+    job = await asyncio.to_thread(pool.queue.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return JobStatusResponse(**job)
+
+async def throttle_prewarm(bucket: TokenBucket, feature: str, complaint: ComplaintData) -> None:
+    """Wait for a token before a pre-warm call that would reach the LLM."""
+    if not getattr(app.state, 'openai_client', None):
+        return
+    cache_key = complaint_cache_key(feature, complaint)
+    if await asyncio.to_thread(cache_client.exists, cache_key):
+        return
+    while not bucket.try_acquire():
+        # retry_after() rounds up to whole seconds for the Retry-After header
+        await asyncio.sleep(bucket.period / bucket.rate)
+
+async def prewarm_cache(complaints: List[ComplaintData], features: List[str]) -> None:
+    """
+    Populate the result cache (and the priority index) for a complaint backlog.
+
+    PREWARM_CONCURRENCY complaints are warmed at once, and misses that would
+    call the LLM are limited to PREWARM_RATE_LIMIT per minute so a backlog
+    does not exhaust the OpenAI quota that live requests need.
+    """
+    started = time.perf_counter()
+    bucket = TokenBucket(settings.PREWARM_RATE_LIMIT, burst=settings.PREWARM_CONCURRENCY)
+    pending = iter(complaints)
+    warmed = 0
+
+    async def worker() -> None:
+        nonlocal warmed
+        for complaint in pending:
+            try:
+                if "danger_score" in features:
+                    await throttle_prewarm(bucket, "danger_score", complaint)
+                    result = await generate_danger_score(complaint)
+                    await run_priority_io(track_scored_complaint, complaint, result)
+                if "auto_description" in features:
+                    await throttle_prewarm(bucket, "auto_description", complaint)
+                    await generate_auto_description(complaint)
+                warmed += 1
+            except Exception as e:
+                logger.warning(f"Cache pre-warm failed for a complaint: {e}")
+
+    await asyncio.gather(*(worker() for _ in range(max(1, settings.PREWARM_CONCURRENCY))))
+    logger.info(f"Pre-warmed {warmed}/{len(complaints)} complaints in {time.perf_counter() - started:.1f}s")
+
+@app.post("/api/ai/cache/prewarm", status_code=status.HTTP_202_ACCEPTED)
+async def prewarm(request: PrewarmRequest, background_tasks: BackgroundTasks):
+    """
+    Queue a cache pre-warm for the open-complaint backlog, e.g. right after a
+    deploy bumps SCORING_RULES_VERSION. Runs in the background, and needs
+    Redis: without it there is no cache to warm.
+    """
+    unknown = set(request.features) - {"danger_score", "auto_description"}
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown features: {', '.join(sorted(unknown))}")
+    if not cache_client:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            detail="Result cache is unavailable (Redis is not connected)")
+    background_tasks.add_task(prewarm_cache, request.complaints, request.features)
+    return {"queued": len(request.complaints), "features": request.features}
+
+def append_feedback(record: Dict[str, Any]) -> None:
+    with open(settings.FEEDBACK_PATH, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+@app.post("/api/ai/feedback", status_code=status.HTTP_201_CREATED)
+async def submit_feedback(feedback: FeedbackRequest):
+    """
+    Record feedback on an AI analysis. Feedback is appended to FEEDBACK_PATH,
+    the training set for `python local_classifier.py train`.
+    """
+    record = feedback.model_dump()
+    record["received_at"] = datetime.utcnow().isoformat()
+    try:
+        await asyncio.to_thread(append_feedback, record)
+    except OSError as e:
+        logger.error(f"Failed to record feedback: {e}")
+        raise HTTPException(status_code=500, detail="Failed to record feedback")
+    return {"status": "recorded", "complaint_id": feedback.complaint_id}
+
+@app.post("/api/ai/events", response_model=PriorityUpdateBatch)
+async def apply_complaint_events(batch: ComplaintEventBatch) -> PriorityUpdateBatch:
+    """
+    Apply complaint change events and return the updated priorities in bulk.
+
+    Only the score components touched by each event are recomputed, and only
+    complaints in this batch are returned. The same updates are published to
+    the `ai:priority_updates` Redis channel, as are the priorities of tracked
+    complaints scored through /api/ai/danger-score.
+    """
+    events = [event.model_dump() for event in batch.events]
+    updates, skipped = await run_priority_io(apply_complaint_changes, events)
+    return PriorityUpdateBatch(updates=updates, skipped=skipped)
+
+@app.get("/api/ai/priority/top", response_model=TopComplaintsResponse)
+async def get_top_complaints(
+    ward: Optional[str] = None,
+    category: Optional[str] = None,
+    k: int = Query(10, ge=1, le=500)
+) -> TopComplaintsResponse:
+    """
+    Return the K most dangerous open complaints, optionally filtered by ward
+    and/or category, straight from the priority index without rescoring.
+    """
+    ranked = await run_priority_io(priority_index.top, k, ward, category)
+    complaints = [
+        RankedComplaint(complaint_id=complaint_id, score=score)
+        for complaint_id, score in ranked
+    ]
+    return TopComplaintsResponse(ward=ward, category=category, complaints=complaints)
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
-    return {"status": "ok", "service": "janmitra-ai"}
+    return {
+        "status": "ok",
+        "service": "janmitra-ai",
+        "startup": getattr(app.state, 'startup_timings', None),
+        "admission": admission_controller.stats()
+    }
 
 # Background task for logging
 async def log_ai_usage(
@@ -535,8 +1079,7 @@ async def log_ai_usage(
             
     except Exception as e:
         logger.error(f"Error logging AI usage: {e}")
-        if settings.SENTRY_DSN:
-            sentry_sdk.capture_exception(e)
+        capture_exception(e)
 
 # Health check endpoint with dependency injection
 @app.get("/health")
@@ -596,7 +1139,11 @@ async def monitor_requests(request: Request, call_next):
         )
 
 # Initialize Prometheus instrumentation
-Instrumentator().instrument(app).expose(app)
+if settings.ENABLE_METRICS:
+    from prometheus_fastapi_instrumentator import Instrumentator
+    Instrumentator().instrument(app).expose(app)
+
+_IMPORT_DURATION = time.perf_counter() - _IMPORT_STARTED
 
 if __name__ == "__main__":
     import uvicorn
@@ -6,14 +6,37 @@ Provides AI endpoints for complaint categorization, duplicate detection, and dan
 
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-from categorization import ComplaintCategorizer
+from categorization import ComplaintCategorizer, RULES_VERSION
+from duplicate_shards import ShardRouter
+from result_cache import ResultCache
+from text_normalization import normalize_text
 import json
+import os
 
 app = Flask(__name__)
 CORS(app)
 
+# Memo for rule-based results; set RESULT_CACHE_PATH to persist it across
+# restarts. It is saved on exit (including SIGTERM) and every
+# RESULT_CACHE_SAVE_SECONDS.
+result_cache = ResultCache(
+    max_entries=int(os.getenv('RESULT_CACHE_SIZE', '10000')),
+    path=os.getenv('RESULT_CACHE_PATH') or None,
+    version=RULES_VERSION
+)
+result_cache.persist_on_shutdown(float(os.getenv('RESULT_CACHE_SAVE_SECONDS', '300')))
+
 # Initialize the categorizer
-categorizer = ComplaintCategorizer()
+categorizer = ComplaintCategorizer(cache=result_cache)
+
+# Duplicate-detection corpus, partitioned by geohash across the nodes in
+# DUPLICATE_SHARD_NODES (run each node with a single worker process). With no
+# nodes configured this process owns every shard.
+shard_router = ShardRouter(
+    nodes=[n.strip() for n in os.getenv('DUPLICATE_SHARD_NODES', '').split(',') if n.strip()],
+    self_node=os.getenv('DUPLICATE_SHARD_SELF') or None,
+    precision=int(os.getenv('DUPLICATE_SHARD_PRECISION', '5'))
+)
 
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -21,7 +44,9 @@ def health_check():
     return jsonify({
         'status': 'ok',
         'service': 'janmitra-ai-services',
-        'version': '1.0.0'
+        'version': '1.0.0',
+        'result_cache': result_cache.stats(),
+        'duplicate_index': shard_router.stats()
     })
 
 @app.route('/categorize', methods=['POST'])
@@ -34,7 +59,7 @@ def categorize_complaint():
             return jsonify({'error': 'Description is required'}), 400
         
         description = data['description']
-        category, confidence = categorizer.categorize(description)
+        category, confidence = categorizer.categorize(description, data.get('language', 'en'))
         
         return jsonify({
             'category': category,
@@ -51,13 +76,24 @@ def detect_duplicates():
     try:
         data = request.get_json()
         
-        if not data or 'description' not in data or 'existing_complaints' not in data:
-            return jsonify({'error': 'Description and existing_complaints are required'}), 400
+        if not data or 'description' not in data:
+            return jsonify({'error': 'Description is required'}), 400
         
         description = data['description']
-        existing_complaints = data['existing_complaints']
-        
-        duplicates = categorizer.detect_duplicates(description, existing_complaints)
+        language = data.get('language', 'en')
+        
+        # Without an explicit candidate list, search the nearby shards of the corpus
+        if 'existing_complaints' in data:
+            duplicates = categorizer.detect_duplicates(description, data['existing_complaints'], language)
+        else:
+            location = data.get('location') or {}
+            duplicates = shard_router.query(
+                description, language,
+                ward=data.get('ward'),
+                lat=location.get('lat'),
+                lng=location.get('lng'),
+                limit=data.get('limit')
+            )
         
         return jsonify({
             'duplicates': duplicates,
@@ -67,6 +103,65 @@ def detect_duplicates():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/duplicate-index', methods=['POST'])
+def index_complaints():
+    """Add (or replace) complaints in the duplicate corpus on their owning shards"""
+    try:
+        data = request.get_json()
+        
+        if not data or 'complaints' not in data:
+            return jsonify({'error': 'complaints is required'}), 400
+        
+        language = data.get('language', 'en')
+        if data.get('local_only'):
+            # Forwarded by another node that already routed these here
+            for complaint in data['complaints']:
+                shard_router.add_local(shard_router.shard_for(complaint), complaint, language)
+            counts = {'local': len(data['complaints'])}
+        else:
+            counts = shard_router.add_many(data['complaints'], language)
+        
+        return jsonify({'indexed': counts, 'total': len(shard_router)})
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/duplicate-index/<complaint_id>', methods=['DELETE'])
+def unindex_complaint(complaint_id):
+    """Remove a resolved complaint from the duplicate corpus on every node"""
+    if not shard_router.remove(complaint_id):
+        return jsonify({'error': 'Complaint not indexed'}), 404
+    return jsonify({'removed': complaint_id, 'total': len(shard_router)})
+
+@app.route('/duplicate-index/remove', methods=['POST'])
+def unindex_complaint_local():
+    """Node-to-node: remove a complaint (or `complaint_ids`) from this node's shards only"""
+    data = request.get_json() or {}
+    if 'complaint_ids' in data:
+        return jsonify({'removed': shard_router.remove_local_many(data['complaint_ids'])})
+    return jsonify({'removed': shard_router.remove_local(data.get('complaint_id'))})
+
+@app.route('/duplicate-index/query', methods=['POST'])
+def query_shards():
+    """Node-to-node: search the given shards owned by this node"""
+    try:
+        data = request.get_json()
+        
+        if not data or 'description' not in data:
+            return jsonify({'error': 'Description is required'}), 400
+        
+        duplicates = shard_router.query_local(
+            data['description'],
+            data.get('language', 'en'),
+            data.get('shards'),
+            data.get('threshold', 0.3),
+            data.get('ward')
+        )
+        return jsonify({'duplicates': duplicates})
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/danger-score', methods=['POST'])
 def calculate_danger_score():
     """Calculate danger/urgency score for a complaint"""
@@ -79,7 +174,9 @@ def calculate_danger_score():
         description = data['description']
         category = data.get('category', 'other')
         
-        danger_score = categorizer.calculate_danger_score(description, category)
+        danger_score = categorizer.calculate_danger_score(
+            description, category, data.get('language', 'en')
+        )
         
         return jsonify({
             'danger_score': danger_score,
@@ -102,15 +199,19 @@ def analyze_complaint():
         
         description = data['description']
         existing_complaints = data.get('existing_complaints', [])
+        language = data.get('language', 'en')
+        
+        # Normalize once and share the tokens with every scorer
+        normalized = normalize_text(description, language)
         
         # Get category
-        category, confidence = categorizer.categorize(description)
+        category, confidence = categorizer.categorize(normalized)
         
         # Detect duplicates
-        duplicates = categorizer.detect_duplicates(description, existing_complaints)
+        duplicates = categorizer.detect_duplicates(normalized, existing_complaints, language)
         
         # Calculate danger score
-        danger_score = categorizer.calculate_danger_score(description, category)
+        danger_score = categorizer.calculate_danger_score(normalized, category)
         
         return jsonify({
             'category': category,
@@ -140,6 +241,8 @@ if __name__ == '__main__':
     print("  GET  /health - Health check")
     print("  POST /categorize - Categorize complaint")
     print("  POST /detect-duplicates - Detect duplicate complaints")
+    print("  POST /duplicate-index - Add complaints to the duplicate corpus")
+    print("  DELETE /duplicate-index/<id> - Remove a complaint from the corpus")
     print("  POST /danger-score - Calculate danger score")
     print("  POST /analyze - Complete complaint analysis")
     
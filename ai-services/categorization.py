@@ -5,10 +5,39 @@ Simple rule-based categorization system for civic complaints
 """
 
 import re
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple, Union
+
+from duplicate_index import DuplicateIndex
+from result_cache import ResultCache, content_key
+from text_normalization import NormalizedText, as_normalized
+
+# Bump whenever keywords, patterns or score tables change so that
+# memoized (and persisted) results from older rules are not reused
+RULES_VERSION = '3'
+
+# Danger keywords used by calculate_danger_score
+DANGER_KEYWORDS = [
+    'emergency', 'urgent', 'dangerous', 'hazard', 'accident', 'injury',
+    'fire', 'flood', 'collapse', 'broken', 'sharp', 'exposed', 'live wire',
+    'gas leak', 'sewage', 'contamination', 'blocking', 'traffic jam'
+]
+
+# Category-based urgency
+CATEGORY_URGENCY = {
+    'electric': 0.3,  # Electrical issues are generally more urgent
+    'water': 0.2,     # Water issues can be urgent
+    'roads': 0.1,     # Road issues are moderately urgent
+    'sanitation': 0.05, # Sanitation issues are less urgent
+    'parks': 0.02,    # Park issues are least urgent
+    'traffic': 0.15,  # Traffic issues are moderately urgent
+    'other': 0.05
+}
 
 class ComplaintCategorizer:
-    def __init__(self):
+    def __init__(self, cache: Optional[ResultCache] = None):
+        # Memo for categorize/calculate_danger_score results (None disables it)
+        self.cache = cache
+
         # Define category keywords and patterns
         self.category_patterns = {
             'roads': {
@@ -36,14 +65,29 @@ class ComplaintCategorizer:
                 'patterns': [r'traffic.*signal', r'parking.*problem', r'traffic.*jam', r'speed.*limit']
             }
         }
+
+        # Precompile patterns and the per-category maximum score once
+        self._compiled_patterns = {
+            category: [re.compile(pattern) for pattern in config['patterns']]
+            for category, config in self.category_patterns.items()
+        }
+        self._max_category_scores = {
+            category: len(config['keywords']) + len(config['patterns']) * 2
+            for category, config in self.category_patterns.items()
+        }
     
-    def categorize(self, description: str) -> Tuple[str, float]:
+    def categorize(self, description: Union[str, NormalizedText], language: str = 'en') -> Tuple[str, float]:
         """
-        Categorize a complaint description
+        Categorize a complaint description (raw text or output of normalize_text)
         Returns: (category, confidence_score)
         """
-        description_lower = description.lower()
-        
+        description_lower = as_normalized(description, language).text
+        if self.cache is None:
+            return self._categorize(description_lower)
+        key = content_key('categorize', description_lower)
+        return self.cache.get_or_compute(key, lambda: self._categorize(description_lower))
+
+    def _categorize(self, description_lower: str) -> Tuple[str, float]:
         category_scores = {}
         
         for category, config in self.category_patterns.items():
@@ -55,8 +99,8 @@ class ComplaintCategorizer:
                     score += 1
             
             # Check patterns
-            for pattern in config['patterns']:
-                if re.search(pattern, description_lower):
+            for pattern in self._compiled_patterns[category]:
+                if pattern.search(description_lower):
                     score += 2
             
             category_scores[category] = score
@@ -69,77 +113,46 @@ class ComplaintCategorizer:
         max_score = category_scores[best_category]
         
         # Calculate confidence (normalize to 0-1)
-        total_possible_score = len(self.category_patterns[best_category]['keywords']) + len(self.category_patterns[best_category]['patterns']) * 2
+        total_possible_score = self._max_category_scores[best_category]
         confidence = min(max_score / total_possible_score, 1.0)
         
         return best_category, confidence
     
-    def detect_duplicates(self, new_description: str, existing_complaints: List[Dict]) -> List[Dict]:
+    def detect_duplicates(self, new_description: Union[str, NormalizedText], existing_complaints: List[Dict],
+                          language: str = 'en') -> List[Dict]:
         """
         Detect potential duplicate complaints
         Returns list of potential duplicates with similarity scores
         """
-        duplicates = []
-        new_desc_lower = new_description.lower()
-        
-        for complaint in existing_complaints:
-            existing_desc_lower = complaint.get('description', '').lower()
-            
-            # Simple similarity check using common words
-            new_words = set(new_desc_lower.split())
-            existing_words = set(existing_desc_lower.split())
-            
-            if len(new_words) == 0 or len(existing_words) == 0:
-                continue
-            
-            # Calculate Jaccard similarity
-            intersection = len(new_words.intersection(existing_words))
-            union = len(new_words.union(existing_words))
-            similarity = intersection / union if union > 0 else 0
-            
-            # Consider it a potential duplicate if similarity > 0.3
-            if similarity > 0.3:
-                duplicates.append({
-                    'complaint_id': complaint.get('complaint_id'),
-                    'similarity': similarity,
-                    'description': complaint.get('description')
-                })
-        
-        # Sort by similarity (highest first)
-        duplicates.sort(key=lambda x: x['similarity'], reverse=True)
-        return duplicates
+        # Index the candidates compactly and compare sorted token-id arrays
+        index = DuplicateIndex()
+        # Keyed by position: candidates without (or sharing) an id must all be compared
+        index.add_many(existing_complaints, language, key_by_position=True)
+        return index.query(new_description, language)
     
-    def calculate_danger_score(self, description: str, category: str) -> float:
+    def calculate_danger_score(self, description: Union[str, NormalizedText], category: str,
+                               language: str = 'en') -> float:
         """
         Calculate danger/urgency score for a complaint
         Returns score between 0-1 (1 being most urgent)
         """
-        description_lower = description.lower()
-        danger_keywords = [
-            'emergency', 'urgent', 'dangerous', 'hazard', 'accident', 'injury',
-            'fire', 'flood', 'collapse', 'broken', 'sharp', 'exposed', 'live wire',
-            'gas leak', 'sewage', 'contamination', 'blocking', 'traffic jam'
-        ]
-        
+        description_lower = as_normalized(description, language).text
+        if self.cache is None:
+            return self._calculate_danger_score(description_lower, category)
+        key = content_key('danger_score', category, description_lower)
+        return self.cache.get_or_compute(
+            key, lambda: self._calculate_danger_score(description_lower, category)
+        )
+
+    def _calculate_danger_score(self, description_lower: str, category: str) -> float:
         urgency_score = 0
         
         # Check for danger keywords
-        for keyword in danger_keywords:
+        for keyword in DANGER_KEYWORDS:
             if keyword in description_lower:
                 urgency_score += 0.1
         
-        # Category-based urgency
-        category_urgency = {
-            'electric': 0.3,  # Electrical issues are generally more urgent
-            'water': 0.2,     # Water issues can be urgent
-            'roads': 0.1,     # Road issues are moderately urgent
-            'sanitation': 0.05, # Sanitation issues are less urgent
-            'parks': 0.02,    # Park issues are least urgent
-            'traffic': 0.15,  # Traffic issues are moderately urgent
-            'other': 0.05
-        }
-        
-        urgency_score += category_urgency.get(category, 0.05)
+        urgency_score += CATEGORY_URGENCY.get(category, 0.05)
         
         # Cap at 1.0
         return min(urgency_score, 1.0)
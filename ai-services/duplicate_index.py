@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+JANMITRA AI Services - Duplicate Index
+Compact interned-token corpus for Jaccard duplicate detection
+"""
+
+import threading
+from array import array
+from typing import Dict, Iterable, List, Optional, Union
+
+from text_normalization import NormalizedText, as_normalized
+
+DEFAULT_THRESHOLD = 0.3
+
+
+class TokenVocabulary:
+    """Global token -> integer id table, so each token string is stored once"""
+
+    __slots__ = ('ids',)
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def intern(self, token: str) -> int:
+        token_id = self.ids.get(token)
+        if token_id is None:
+            token_id = self.ids[token] = len(self.ids)
+        return token_id
+
+    def lookup(self, token: str) -> Optional[int]:
+        return self.ids.get(token)
+
+
+class ComplaintRecord:
+    """Metadata for one indexed complaint; its token ids live in the shared buffer"""
+
+    __slots__ = ('complaint_id', 'description', 'start', 'end', 'key')
+
+    def __init__(self, complaint_id, description: Optional[str], start: int, end: int, key=None):
+        self.complaint_id = complaint_id
+        self.description = description
+        self.start = start
+        self.end = end
+        self.key = complaint_id if key is None else key
+
+
+class DuplicateIndex:
+    """
+    Complaint corpus stored as sorted, duplicate-free token-id runs in one contiguous
+    `array('I')` buffer, with per-complaint offsets kept in slotted records.
+
+    Removal leaves a tombstone; the buffer is compacted once more than half of
+    it is dead.
+
+    Records are keyed by complaint id unless another `key` is given. All
+    operations take one lock: a query exports a buffer view of `tokens`, and
+    the array can't be resized (nor records compacted) while that view exists.
+    """
+
+    def __init__(self, vocabulary: Optional[TokenVocabulary] = None, keep_descriptions: bool = True):
+        self.vocabulary = vocabulary if vocabulary is not None else TokenVocabulary()
+        self.keep_descriptions = keep_descriptions
+        self.tokens = array('I')
+        self.records: List[Optional[ComplaintRecord]] = []
+        self._slots: Dict[object, int] = {}
+        self._dead_tokens = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, complaint_id) -> bool:
+        return complaint_id in self._slots
+
+    def add(self, complaint_id, description: Union[str, NormalizedText], language: str = 'en',
+            key=None) -> None:
+        """Index a complaint, replacing any earlier one with the same key (default: its id)"""
+        key = complaint_id if key is None else key
+        normalized = as_normalized(description, language)
+        raw = description if isinstance(description, str) else None
+        with self._lock:
+            if key in self._slots:
+                self.remove(key)
+
+            token_ids = sorted(self.vocabulary.intern(term) for term in normalized.terms)
+            start = len(self.tokens)
+            self.tokens.extend(token_ids)
+            record = ComplaintRecord(
+                complaint_id, raw if self.keep_descriptions else None, start, len(self.tokens), key
+            )
+            self._slots[key] = len(self.records)
+            self.records.append(record)
+
+    def add_many(self, complaints: Iterable[Dict], language: str = 'en', key_by_position: bool = False) -> None:
+        """
+        Index complaint dicts shaped like the /detect-duplicates payload. With
+        `key_by_position`, complaints are keyed by list position so ones with a
+        missing or repeated id are all kept.
+        """
+        for position, complaint in enumerate(complaints):
+            self.add(
+                complaint.get('complaint_id'),
+                complaint.get('description', ''),
+                complaint.get('language', language),
+                key=position if key_by_position else None
+            )
+
+    def remove(self, key) -> bool:
+        with self._lock:
+            slot = self._slots.pop(key, None)
+            if slot is None:
+                return False
+            record = self.records[slot]
+            self.records[slot] = None
+            self._dead_tokens += record.end - record.start
+            if self._dead_tokens * 2 > len(self.tokens):
+                self.compact()
+            return True
+
+    def compact(self) -> None:
+        """Rewrite the token buffer and record list without tombstones"""
+        with self._lock:
+            tokens = array('I')
+            records: List[Optional[ComplaintRecord]] = []
+            self._slots = {}
+            for record in self.records:
+                if record is None:
+                    continue
+                start = len(tokens)
+                tokens.extend(self.tokens[record.start:record.end])
+                record.start, record.end = start, len(tokens)
+                self._slots[record.key] = len(records)
+                records.append(record)
+            self.tokens = tokens
+            self.records = records
+            self._dead_tokens = 0
+
+    def query(self, description: Union[str, NormalizedText], language: str = 'en',
+              threshold: float = DEFAULT_THRESHOLD, limit: Optional[int] = None) -> List[Dict]:
+        """
+        Return indexed complaints whose Jaccard similarity exceeds `threshold`,
+        most similar first, in the /detect-duplicates response shape
+        """
+        terms = as_normalized(description, language).terms
+        if not terms:
+            return []
+
+        # Terms missing from the vocabulary can't intersect anything but still
+        # count towards the union through `size`
+        token_ids = (self.vocabulary.lookup(term) for term in terms)
+        common_with = frozenset(t for t in token_ids if t is not None).intersection
+        size = len(terms)
+
+        duplicates = []
+        with self._lock, memoryview(self.tokens) as tokens:
+            for record in self.records:
+                if record is None:
+                    continue
+                other_size = record.end - record.start
+                # Jaccard can't exceed min/max of the set sizes
+                if not other_size or min(size, other_size) <= threshold * max(size, other_size):
+                    continue
+                # Probing the small query set from C is ~10x faster in CPython than
+                # a Python-level merge walk over the two sorted runs
+                common = len(common_with(tokens[record.start:record.end]))
+                similarity = common / (size + other_size - common)
+                if similarity > threshold:
+                    duplicates.append({
+                        'complaint_id': record.complaint_id,
+                        'similarity': similarity,
+                        'description': record.description
+                    })
+
+        duplicates.sort(key=lambda x: x['similarity'], reverse=True)
+        return duplicates[:limit] if limit else duplicates
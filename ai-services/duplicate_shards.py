@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+JANMITRA AI Services - Sharded Duplicate Index
+Partitions the duplicate corpus by geohash (ward as a filter) across service nodes
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from duplicate_index import DEFAULT_THRESHOLD, DuplicateIndex, TokenVocabulary
+from text_normalization import normalize_text
+
+logger = logging.getLogger(__name__)
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+# Precision 5 cells are roughly 4.9km x 4.9km
+DEFAULT_PRECISION = 5
+
+# transport(node, path, payload) -> decoded JSON response
+Transport = Callable[[str, str, Dict], Dict]
+
+
+def geohash_encode(lat: float, lng: float, precision: int = DEFAULT_PRECISION) -> str:
+    """Standard base32 geohash of a coordinate"""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        rng, coord = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        value <<= 1
+        if coord >= mid:
+            value |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            bits, value = 0, 0
+    return ''.join(chars)
+
+
+def geohash_neighbors(lat: float, lng: float, precision: int = DEFAULT_PRECISION) -> List[str]:
+    """The cell containing the point plus its eight surrounding cells"""
+    # Cell size at this precision (lng gets the extra bit on odd totals)
+    total_bits = precision * 5
+    lat_step = 180.0 / (1 << (total_bits // 2))
+    lng_step = 360.0 / (1 << ((total_bits + 1) // 2))
+    cells = []
+    for d_lat in (-lat_step, 0.0, lat_step):
+        for d_lng in (-lng_step, 0.0, lng_step):
+            n_lat = max(-90.0, min(90.0, lat + d_lat))
+            n_lng = (lng + d_lng + 180.0) % 360.0 - 180.0
+            cell = geohash_encode(n_lat, n_lng, precision)
+            if cell not in cells:
+                cells.append(cell)
+    return cells
+
+
+def http_transport(timeout: float = 2.0) -> Transport:
+    """JSON-over-HTTP transport between nodes (stdlib only)"""
+    def send(node: str, path: str, payload: Dict) -> Dict:
+        req = urllib.request.Request(
+            f"{node.rstrip('/')}{path}",
+            data=json.dumps(payload).encode('utf-8'),
+            headers={'Content-Type': 'application/json'},
+            method='POST'
+        )
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            return json.loads(response.read().decode('utf-8'))
+    return send
+
+
+class ShardRouter:
+    """
+    Owns the shards assigned to this node and routes everything else.
+
+    A complaint's shard is the geohash cell of its location, so a complaint
+    is found by location whether or not it (or the query) names a ward. The
+    ward is kept as a filter: a query naming a ward skips complaints from
+    other wards. Complaints with a ward but no location go to a `ward:<ward>`
+    shard, which only queries naming that ward (or no location) consult.
+    Shards are assigned to nodes by rendezvous hashing, so adding a node only
+    moves the shards it wins. With no nodes configured this node owns every
+    shard.
+    """
+
+    def __init__(self, nodes: Optional[List[str]] = None, self_node: Optional[str] = None,
+                 precision: int = DEFAULT_PRECISION, transport: Optional[Transport] = None):
+        self.nodes = [n for n in (nodes or []) if n]
+        self.self_node = self_node or (self.nodes[0] if self.nodes else 'local')
+        if self.nodes and self.self_node not in self.nodes:
+            raise ValueError(f"This node ({self.self_node}) is not in the shard node list")
+        self.precision = precision
+        self.transport = transport or http_transport()
+        self.vocabulary = TokenVocabulary()
+        self.shards: Dict[str, DuplicateIndex] = {}
+        self._shard_of: Dict[object, str] = {}
+        self._ward_of: Dict[object, Optional[str]] = {}
+        # Guards the maps above; each DuplicateIndex has its own lock
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max(1, len(self.nodes)))
+
+    def __len__(self) -> int:
+        return len(self._shard_of)
+
+    # Placement
+
+    def shard_for(self, complaint: Dict) -> Optional[str]:
+        location = complaint.get('location') or {}
+        lat, lng = location.get('lat'), location.get('lng')
+        if lat is not None and lng is not None:
+            return geohash_encode(float(lat), float(lng), self.precision)
+        if complaint.get('ward'):
+            return f"ward:{complaint['ward']}"
+        return None
+
+    def query_shards(self, ward: Optional[str] = None, lat: Optional[float] = None,
+                     lng: Optional[float] = None) -> Optional[List[str]]:
+        """Shards a duplicate query must consult; None means every shard"""
+        if lat is None or lng is None:
+            return None
+        shards = geohash_neighbors(float(lat), float(lng), self.precision)
+        if ward:
+            shards.append(f"ward:{ward}")
+        return shards
+
+    def owner(self, shard: str) -> str:
+        if not self.nodes:
+            return self.self_node
+        return max(
+            self.nodes,
+            key=lambda node: hashlib.blake2b(f"{node}|{shard}".encode('utf-8'), digest_size=8).digest()
+        )
+
+    def is_local(self, shard: str) -> bool:
+        return self.owner(shard) == self.self_node
+
+    # Local operations
+
+    def add_local(self, shard: str, complaint: Dict, language: str = 'en') -> None:
+        complaint_id = complaint.get('complaint_id')
+        with self._lock:
+            previous = self._shard_of.get(complaint_id)
+            if previous is not None and previous != shard:
+                self._remove_from_shard(previous, complaint_id)
+            index = self.shards.get(shard)
+            if index is None:
+                index = self.shards[shard] = DuplicateIndex(vocabulary=self.vocabulary)
+            index.add(complaint_id, complaint.get('description', ''), complaint.get('language', language))
+            self._shard_of[complaint_id] = shard
+            self._ward_of[complaint_id] = complaint.get('ward') or None
+
+    def remove_local(self, complaint_id) -> bool:
+        with self._lock:
+            shard = self._shard_of.pop(complaint_id, None)
+            self._ward_of.pop(complaint_id, None)
+            if shard is None:
+                return False
+            self._remove_from_shard(shard, complaint_id)
+            return True
+
+    def remove_local_many(self, complaint_ids: Iterable) -> List:
+        """Remove complaints from this node's shards; returns the ids that were indexed"""
+        return [complaint_id for complaint_id in complaint_ids if self.remove_local(complaint_id)]
+
+    def _remove_from_shard(self, shard: str, complaint_id) -> None:
+        index = self.shards[shard]
+        index.remove(complaint_id)
+        if not len(index):
+            del self.shards[shard]
+
+    def query_local(self, description: str, language: str = 'en', shards: Optional[Iterable[str]] = None,
+                    threshold: float = DEFAULT_THRESHOLD, ward: Optional[str] = None) -> List[Dict]:
+        """Search this node's shards; with `ward`, complaints from other wards are skipped"""
+        normalized = normalize_text(description, language)
+        with self._lock:
+            names = list(self.shards) if shards is None else shards
+            indexes = [self.shards[name] for name in names if name in self.shards]
+        results = []
+        for index in indexes:
+            results.extend(index.query(normalized, threshold=threshold))
+        if ward:
+            results = [r for r in results if self._ward_of.get(r['complaint_id']) in (None, ward)]
+        return results
+
+    # Routed operations
+
+    def add_many(self, complaints: Iterable[Dict], language: str = 'en') -> Dict[str, Any]:
+        """
+        Index complaints on their owning nodes. Complaints without a ward or
+        location can't be placed and are skipped. Batches for other nodes are
+        sent in parallel; complaints a node could not take are counted under
+        `failed`, with the node listed in `failed_nodes`.
+
+        A re-indexed complaint may have moved to a shard on another node, so
+        every other node is told to drop its copy.
+        """
+        remote: Dict[str, List[Dict]] = {}
+        owner_of: Dict[object, str] = {}
+        counts: Dict[str, Any] = {'local': 0, 'forwarded': 0, 'skipped': 0, 'failed': 0, 'failed_nodes': []}
+        for complaint in complaints:
+            shard = self.shard_for(complaint)
+            if shard is None:
+                counts['skipped'] += 1
+                continue
+            owner = self.owner(shard)
+            if complaint.get('complaint_id') is not None:
+                owner_of[complaint['complaint_id']] = owner
+            if owner == self.self_node:
+                self.add_local(shard, complaint, language)
+                counts['local'] += 1
+            else:
+                remote.setdefault(owner, []).append(complaint)
+                counts['forwarded'] += 1
+
+        self.remove_local_many(cid for cid, owner in owner_of.items() if owner != self.self_node)
+        purges = []
+        for node in self.nodes:
+            stale = [cid for cid, owner in owner_of.items() if owner != node]
+            if node != self.self_node and stale:
+                purges.append((node, self._pool.submit(
+                    self.transport, node, '/duplicate-index/remove', {'complaint_ids': stale}
+                )))
+
+        futures = [
+            (node, batch, self._pool.submit(
+                self.transport, node, '/duplicate-index',
+                {'complaints': batch, 'language': language, 'local_only': True}
+            ))
+            for node, batch in remote.items()
+        ]
+        for node, batch, future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                logger.warning(f"Failed to forward {len(batch)} complaints to {node}: {e}")
+                counts['forwarded'] -= len(batch)
+                counts['failed'] += len(batch)
+                counts['failed_nodes'].append(node)
+        for node, future in purges:
+            try:
+                future.result()
+            except Exception as e:
+                # query() drops the duplicate copy until the node is reachable again
+                logger.warning(f"Failed to remove moved complaints from {node}: {e}")
+        return counts
+
+    def remove(self, complaint_id, broadcast: bool = True) -> bool:
+        """Remove a complaint here and, unless told otherwise, on every other node"""
+        removed = self.remove_local(complaint_id)
+        if broadcast:
+            for node in self.nodes:
+                if node == self.self_node:
+                    continue
+                try:
+                    response = self.transport(node, '/duplicate-index/remove', {'complaint_id': complaint_id})
+                    removed = removed or bool(response.get('removed'))
+                except Exception as e:
+                    logger.warning(f"Failed to remove {complaint_id} from {node}: {e}")
+        return removed
+
+    def query(self, description: str, language: str = 'en', ward: Optional[str] = None,
+              lat: Optional[float] = None, lng: Optional[float] = None,
+              threshold: float = DEFAULT_THRESHOLD, limit: Optional[int] = None) -> List[Dict]:
+        """Search only the shards near the complaint, on whichever nodes own them"""
+        shards = self.query_shards(ward, lat, lng)
+
+        by_node: Dict[str, Optional[List[str]]] = {}
+        if shards is None:
+            for node in self.nodes or [self.self_node]:
+                by_node[node] = None
+        else:
+            for shard in shards:
+                by_node.setdefault(self.owner(shard), []).append(shard)
+
+        futures = []
+        results: List[Dict] = []
+        for node, node_shards in by_node.items():
+            if node == self.self_node:
+                continue
+            payload = {'description': description, 'language': language,
+                       'shards': node_shards, 'threshold': threshold, 'ward': ward}
+            futures.append((node, self._pool.submit(self.transport, node, '/duplicate-index/query', payload)))
+
+        if self.self_node in by_node:
+            results.extend(self.query_local(description, language, by_node[self.self_node], threshold, ward))
+
+        for node, future in futures:
+            try:
+                results.extend(future.result().get('duplicates', []))
+            except Exception as e:
+                logger.warning(f"Duplicate shard query to {node} failed: {e}")
+
+        # A complaint can be indexed on two nodes while it moves between them
+        best: Dict[object, Dict] = {}
+        for result in results:
+            key = result['complaint_id'] if result['complaint_id'] is not None else id(result)
+            if key not in best or result['similarity'] > best[key]['similarity']:
+                best[key] = result
+        results = sorted(best.values(), key=lambda x: x['similarity'], reverse=True)
+        return results[:limit] if limit else results
+
+    def stats(self) -> Dict:
+        return {
+            'node': self.self_node,
+            'nodes': len(self.nodes) or 1,
+            'shards': len(self.shards),
+            'complaints': len(self._shard_of),
+            'vocabulary': len(self.vocabulary)
+        }
@@ -0,0 +1,445 @@
+#!/usr/bin/env python3
+"""
+JANMITRA AI Services - Job Queue
+Durable queue and worker pool for asynchronous AI analysis jobs
+"""
+
+import asyncio
+import functools
+import json
+import logging
+import posixpath
+import re
+import sqlite3
+import threading
+import time
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+from urllib.parse import unquote, urlsplit
+
+logger = logging.getLogger(__name__)
+
+# handler(payload) -> JSON-serializable result
+JobHandler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+STALE_JOB_ERROR = 'Job was interrupted too many times'
+
+
+def new_job(job_type: str, payload: Dict[str, Any], callback_url: Optional[str] = None) -> Dict[str, Any]:
+    now = time.time()
+    return {
+        'job_id': uuid.uuid4().hex,
+        'type': job_type,
+        'payload': payload,
+        'status': 'queued',
+        'result': None,
+        'error': None,
+        'callback_url': callback_url,
+        'attempts': 0,
+        'created_at': now,
+        'updated_at': now,
+    }
+
+
+class SQLiteJobQueue:
+    """
+    Local durable queue in a SQLite file, used when Redis is not available.
+
+    Jobs claimed by a worker that died are requeued by `requeue_stale`, or
+    failed once they have been attempted `max_attempts` times.
+    """
+
+    def __init__(self, path: str = 'ai_jobs.db', max_attempts: int = 3):
+        self.path = path
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                type TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                callback_url TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        ''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)')
+
+    def enqueue(self, job: Dict[str, Any]) -> None:
+        with self._lock:
+            self._conn.execute(
+                'INSERT INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (job['job_id'], job['type'], json.dumps(job['payload']), job['status'], None, None,
+                 job['callback_url'], 0, job['created_at'], job['updated_at'])
+            )
+
+    def claim(self, block_seconds: float = 1.0) -> Optional[Dict[str, Any]]:
+        """Atomically take the oldest queued job, or return None if there is none"""
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = self._conn.execute(
+                    "SELECT job_id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+                ).fetchone()
+                if row:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'running', attempts = attempts + 1, updated_at = ? "
+                        "WHERE job_id = ?",
+                        (time.time(), row[0])
+                    )
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        if row is None:
+            # Nothing to do; the caller's loop waits before polling again
+            time.sleep(block_seconds)
+            return None
+        return self.get(row[0])
+
+    def complete(self, job_id: str, result: Any) -> None:
+        self._finish(job_id, 'done', result=json.dumps(result))
+
+    def fail(self, job_id: str, error: str) -> None:
+        self._finish(job_id, 'failed', error=error)
+
+    def _finish(self, job_id: str, status: str, result: Optional[str] = None, error: Optional[str] = None) -> None:
+        with self._lock:
+            self._conn.execute(
+                'UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ? WHERE job_id = ?',
+                (status, result, error, time.time(), job_id)
+            )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT job_id, type, payload, status, result, error, callback_url, attempts, '
+                'created_at, updated_at FROM jobs WHERE job_id = ?',
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            'job_id': row[0], 'type': row[1], 'payload': json.loads(row[2]), 'status': row[3],
+            'result': json.loads(row[4]) if row[4] else None, 'error': row[5],
+            'callback_url': row[6], 'attempts': row[7], 'created_at': row[8], 'updated_at': row[9],
+        }
+
+    def depth(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+
+    def requeue_stale(self, older_than_seconds: float) -> int:
+        """
+        Put jobs stuck in 'running' (e.g. after a crash) back on the queue, or
+        fail them if they are out of attempts. Returns how many were recovered.
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET "
+                "status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END, "
+                "error = CASE WHEN attempts >= ? THEN ? ELSE error END, "
+                "updated_at = ? "
+                "WHERE status = 'running' AND updated_at < ?",
+                (self.max_attempts, self.max_attempts, STALE_JOB_ERROR, now, now - older_than_seconds)
+            )
+        return cursor.rowcount
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class RedisStreamJobQueue:
+    """
+    Redis Streams backed queue shared by every service instance.
+
+    Job ids travel through the stream; job state is stored as JSON under
+    `ai:job:<id>` and expires after `ttl` seconds. A stream entry is only
+    acknowledged once its job completes or fails, so the entries of a worker
+    that died stay pending, and `requeue_stale` re-adds them to the stream.
+    """
+
+    def __init__(self, client, stream: str = 'ai:jobs', group: str = 'ai-workers',
+                 consumer: Optional[str] = None, ttl: int = 24 * 3600, max_attempts: int = 3):
+        self.client = client
+        self.stream = stream
+        self.group = group
+        self.consumer = consumer or uuid.uuid4().hex[:12]
+        self.ttl = ttl
+        self.max_attempts = max_attempts
+        try:
+            self.client.xgroup_create(self.stream, self.group, id='0', mkstream=True)
+        except Exception as e:
+            # BUSYGROUP: the group already exists
+            if 'BUSYGROUP' not in str(e):
+                raise
+
+    def _key(self, job_id: str) -> str:
+        return f"ai:job:{job_id}"
+
+    def _save(self, job: Dict[str, Any]) -> None:
+        self.client.set(self._key(job['job_id']), json.dumps(job), ex=self.ttl)
+
+    def enqueue(self, job: Dict[str, Any]) -> None:
+        self._save(job)
+        self.client.xadd(self.stream, {'job_id': job['job_id']})
+
+    def _ack(self, message_id: str) -> None:
+        pipe = self.client.pipeline()
+        pipe.xack(self.stream, self.group, message_id)
+        pipe.xdel(self.stream, message_id)
+        pipe.execute()
+
+    def claim(self, block_seconds: float = 1.0) -> Optional[Dict[str, Any]]:
+        entries = self.client.xreadgroup(
+            self.group, self.consumer, {self.stream: '>'}, count=1, block=int(block_seconds * 1000)
+        )
+        if not entries:
+            return None
+        _, messages = entries[0]
+        message_id, fields = messages[0]
+
+        job = self.get(fields['job_id'])
+        if job is None or job['status'] not in ('queued', 'running'):
+            # Expired or already finished; nothing left to run
+            self._ack(message_id)
+            return None
+        # The entry stays pending until complete()/fail() acknowledges it
+        job.update(status='running', attempts=job['attempts'] + 1, updated_at=time.time(),
+                   message_id=message_id)
+        self._save(job)
+        return job
+
+    def complete(self, job_id: str, result: Any) -> None:
+        self._finish(job_id, 'done', result=result)
+
+    def fail(self, job_id: str, error: str) -> None:
+        self._finish(job_id, 'failed', error=error)
+
+    def _finish(self, job_id: str, status: str, result: Any = None, error: Optional[str] = None) -> None:
+        job = self.get(job_id)
+        if job is None:
+            return
+        job.update(status=status, result=result, error=error, updated_at=time.time())
+        self._save(job)
+        if job.get('message_id'):
+            self._ack(job['message_id'])
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        raw = self.client.get(self._key(job_id))
+        return json.loads(raw) if raw else None
+
+    def depth(self) -> int:
+        return self.client.xlen(self.stream)
+
+    def requeue_stale(self, older_than_seconds: float, batch: int = 100) -> int:
+        """
+        Re-add jobs whose stream entries have been pending (claimed but not
+        acknowledged) for longer than `older_than_seconds`, e.g. because the
+        worker crashed, or fail them if they are out of attempts. Returns how
+        many were recovered.
+        """
+        idle_ms = int(older_than_seconds * 1000)
+        pending = self.client.xpending_range(
+            self.stream, self.group, min='-', max='+', count=batch, idle=idle_ms
+        )
+        recovered = 0
+        for entry in pending:
+            message_id = entry['message_id']
+            # Claiming first means only one instance recovers each entry
+            claimed = self.client.xclaim(
+                self.stream, self.group, self.consumer, min_idle_time=idle_ms, message_ids=[message_id]
+            )
+            if not claimed:
+                continue
+            _, fields = claimed[0]
+            job = self.get(fields['job_id']) if fields else None
+            if job is not None and job['status'] in ('queued', 'running'):
+                if job['attempts'] >= self.max_attempts:
+                    job.update(status='failed', error=STALE_JOB_ERROR, updated_at=time.time())
+                    self._save(job)
+                else:
+                    job.update(status='queued', updated_at=time.time(), message_id=None)
+                    self._save(job)
+                    self.client.xadd(self.stream, {'job_id': job['job_id']})
+                recovered += 1
+            self._ack(message_id)
+        return recovered
+
+    def close(self) -> None:
+        pass
+
+
+def _callback_path(path: str) -> Optional[str]:
+    """
+    `path` with duplicate slashes collapsed, or None if it has '.' or '..'
+    segments (also percent-encoded or behind a backslash), which the
+    receiving server would resolve to somewhere else.
+    """
+    decoded = unquote(path)
+    if any(segment in ('.', '..') for segment in re.split(r'[/\\]', decoded)):
+        return None
+    return posixpath.normpath(decoded) if decoded else '/'
+
+
+def callback_allowed(url: str, allowed_prefixes: Iterable[str]) -> bool:
+    """
+    True if `url` has the scheme and host[:port] of one of `allowed_prefixes`
+    and its path is that prefix's path or lies below it. Hosts are compared
+    exactly, so 'http://backend:5000' does not allow 'http://backend:5000.evil.com',
+    and paths only match at a segment boundary, so '/api/ai-jobs' does not
+    allow '/api/ai-jobs-evil' or '/api/ai-jobs/../admin'.
+    """
+    try:
+        target = urlsplit(url)
+    except ValueError:
+        return False
+    path = _callback_path(target.path)
+    if path is None:
+        return False
+    for prefix in allowed_prefixes:
+        allowed = urlsplit(prefix)
+        base = posixpath.normpath(allowed.path or '/').rstrip('/')
+        if (target.scheme.lower() == allowed.scheme.lower() and
+                target.netloc.lower() == allowed.netloc.lower() and
+                (path == base or path.startswith(base + '/'))):
+            return True
+    return False
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Redirects could lead a callback outside the allowlist, so they fail instead"""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+_callback_opener = urllib.request.build_opener(_NoRedirect)
+
+
+def post_callback(url: str, job: Dict[str, Any], timeout: float = 5.0) -> None:
+    body = {k: job[k] for k in ('job_id', 'type', 'status', 'result', 'error')}
+    req = urllib.request.Request(
+        url,
+        data=json.dumps(body).encode('utf-8'),
+        headers={'Content-Type': 'application/json'},
+        method='POST'
+    )
+    _callback_opener.open(req, timeout=timeout).close()
+
+
+class JobWorkerPool:
+    """
+    Runs `concurrency` asyncio workers that claim jobs from `queue` and
+    dispatch them to `handlers` by job type. Queue calls are blocking and run
+    in the pool's own threads, so the event loop keeps serving HTTP requests
+    and workers waiting in `claim` do not hold the default executor that
+    request handlers use for `asyncio.to_thread`.
+
+    Every `recover_seconds`, jobs claimed more than `stale_seconds` ago and
+    never finished (their worker died) are requeued. `stale_seconds` must
+    exceed the longest handler run, or a slow job may run twice.
+
+    Callbacks are only sent to URLs under `callback_prefixes`; submitting any
+    other `callback_url` raises ValueError.
+    """
+
+    def __init__(self, queue, handlers: Dict[str, JobHandler], concurrency: int = 4,
+                 poll_seconds: float = 1.0, callback_prefixes: Iterable[str] = (),
+                 stale_seconds: float = 300.0, recover_seconds: float = 60.0):
+        self.queue = queue
+        self.handlers = handlers
+        self.concurrency = concurrency
+        self.poll_seconds = poll_seconds
+        self.callback_prefixes = [p for p in callback_prefixes if p]
+        self.stale_seconds = stale_seconds
+        self.recover_seconds = recover_seconds
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = False
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def submit(self, job_type: str, payload: Dict[str, Any], callback_url: Optional[str] = None) -> Dict[str, Any]:
+        if job_type not in self.handlers:
+            raise ValueError(f"Unknown job type: {job_type}")
+        if callback_url and not callback_allowed(callback_url, self.callback_prefixes):
+            raise ValueError("callback_url is not in the allowed callback prefixes")
+        job = new_job(job_type, payload, callback_url)
+        self.queue.enqueue(job)
+        return job
+
+    def start(self) -> None:
+        self._stopping = False
+        # One thread per worker plus one for recovery: each makes one blocking call at a time
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency + 1,
+                                            thread_name_prefix='ai-job-worker')
+        self._tasks = [asyncio.create_task(self._run(i)) for i in range(self.concurrency)]
+        self._tasks.append(asyncio.create_task(self._recover()))
+        logger.info(f"Started {self.concurrency} AI job workers ({type(self.queue).__name__})")
+
+    async def stop(self) -> None:
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._executor:
+            # A claim still blocked in its thread returns within poll_seconds
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _in_thread(self, func: Callable[..., Any], *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args))
+
+    async def _run(self, worker_id: int) -> None:
+        while not self._stopping:
+            try:
+                job = await self._in_thread(self.queue.claim, self.poll_seconds)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job worker {worker_id} failed to claim a job: {e}")
+                await asyncio.sleep(self.poll_seconds)
+                continue
+            if job is not None:
+                await self._process(job)
+
+    async def _recover(self) -> None:
+        while not self._stopping:
+            try:
+                recovered = await self._in_thread(self.queue.requeue_stale, self.stale_seconds)
+                if recovered:
+                    logger.info(f"Recovered {recovered} interrupted AI jobs")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Failed to recover interrupted AI jobs: {e}")
+            await asyncio.sleep(self.recover_seconds)
+
+    async def _process(self, job: Dict[str, Any]) -> None:
+        try:
+            result = await self.handlers[job['type']](job['payload'])
+            await self._in_thread(self.queue.complete, job['job_id'], result)
+            job.update(status='done', result=result)
+        except Exception as e:
+            logger.error(f"AI job {job['job_id']} ({job['type']}) failed: {e}")
+            await self._in_thread(self.queue.fail, job['job_id'], str(e))
+            job.update(status='failed', error=str(e))
+
+        if job.get('callback_url'):
+            if not callback_allowed(job['callback_url'], self.callback_prefixes):
+                logger.warning(f"Callback for job {job['job_id']} skipped: URL is not allowed")
+                return
+            try:
+                await self._in_thread(post_callback, job['callback_url'], job)
+            except Exception as e:
+                logger.warning(f"Callback for job {job['job_id']} failed: {e}")
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+JANMITRA AI Services - Local Classifier
+CPU-only hashed-feature linear models for category and risk level, trained
+offline from user feedback
+
+Usage:
+    python local_classifier.py train feedback.jsonl local_model.npz
+"""
+
+import json
+import sys
+import time
+import zlib
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from text_normalization import as_normalized
+
+N_FEATURES = 1 << 16
+
+# The two tasks trained from feedback
+TASKS = ('category', 'risk_level')
+
+
+def hashed_features(text, language: str = 'en', n_features: int = N_FEATURES) -> np.ndarray:
+    """
+    Feature indices for a complaint: hashed unigrams and bigrams of the
+    normalized tokens. crc32 is used (not `hash`) so that indices are stable
+    across processes.
+    """
+    tokens = as_normalized(text, language).tokens
+    grams = list(tokens) + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    return np.unique(np.fromiter(
+        (zlib.crc32(g.encode('utf-8')) % n_features for g in grams), dtype=np.int64, count=len(grams)
+    ))
+
+
+class HashedLinearClassifier:
+    """Multinomial logistic regression over hashed binary features"""
+
+    def __init__(self, classes: Sequence[str], n_features: int = N_FEATURES):
+        self.classes = list(classes)
+        self.n_features = n_features
+        self.weights = np.zeros((n_features, len(self.classes)), dtype=np.float32)
+        self.bias = np.zeros(len(self.classes), dtype=np.float32)
+
+    def _logits(self, features: np.ndarray) -> np.ndarray:
+        return self.weights[features].sum(axis=0) + self.bias
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        logits = self._logits(features)
+        logits -= logits.max()
+        exp = np.exp(logits)
+        return exp / exp.sum()
+
+    def predict(self, features: np.ndarray) -> Tuple[str, float]:
+        """Return (label, probability) of the most likely class"""
+        proba = self.predict_proba(features)
+        best = int(proba.argmax())
+        return self.classes[best], float(proba[best])
+
+    def fit(self, samples: List[np.ndarray], labels: List[str], epochs: int = 10,
+            learning_rate: float = 0.5, l2: float = 1e-5, seed: int = 0) -> None:
+        """Plain SGD on the cross-entropy loss; only touched weight rows are updated"""
+        rng = np.random.default_rng(seed)
+        targets = np.array([self.classes.index(label) for label in labels])
+        for epoch in range(epochs):
+            rate = learning_rate / (1 + epoch)
+            for i in rng.permutation(len(samples)):
+                features = samples[i]
+                grad = self.predict_proba(features)
+                grad[targets[i]] -= 1.0
+                rows = self.weights[features]
+                self.weights[features] = rows - rate * (grad + l2 * rows)
+                self.bias -= rate * grad
+
+
+class LocalModel:
+    """Category and risk-level classifiers saved together in one .npz file"""
+
+    def __init__(self, classifiers: Dict[str, HashedLinearClassifier], version: str):
+        self.classifiers = classifiers
+        self.version = version
+
+    def predict(self, text, task: str, language: str = 'en') -> Optional[Tuple[str, float]]:
+        classifier = self.classifiers.get(task)
+        if classifier is None:
+            return None
+        return classifier.predict(hashed_features(text, language, classifier.n_features))
+
+    def save(self, path: str) -> None:
+        arrays = {'version': np.array(self.version)}
+        for task, classifier in self.classifiers.items():
+            arrays[f"{task}_classes"] = np.array(classifier.classes)
+            arrays[f"{task}_weights"] = classifier.weights
+            arrays[f"{task}_bias"] = classifier.bias
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> 'LocalModel':
+        data = np.load(path)
+        classifiers = {}
+        for task in TASKS:
+            if f"{task}_weights" not in data or len(data[f"{task}_classes"]) < 2:
+                # A one-class model would predict its label with certainty for any input
+                continue
+            classifier = HashedLinearClassifier(
+                [str(c) for c in data[f"{task}_classes"]], data[f"{task}_weights"].shape[0]
+            )
+            classifier.weights = data[f"{task}_weights"]
+            classifier.bias = data[f"{task}_bias"]
+            classifiers[task] = classifier
+        return cls(classifiers, str(data['version']))
+
+
+def feedback_examples(records: Iterable[Dict]) -> Dict[str, List[Tuple[str, str, str]]]:
+    """
+    Turn feedback records into (description, language, label) examples per
+    task. Corrections override the labels the complaint was given; negative
+    feedback without a correction carries no usable label and is skipped.
+    """
+    examples: Dict[str, List[Tuple[str, str, str]]] = {task: [] for task in TASKS}
+    for record in records:
+        description = record.get('description')
+        if not description:
+            continue
+        corrections = record.get('corrections') or {}
+        for task in TASKS:
+            label = corrections.get(task)
+            if label is None and record.get('feedback_type') == 'positive':
+                label = record.get(task)
+            if label:
+                examples[task].append((description, record.get('language') or 'en', str(label).lower()))
+    return examples
+
+
+def train(records: Iterable[Dict], epochs: int = 10, min_examples: int = 20,
+          min_per_class: int = 5) -> LocalModel:
+    """
+    Train a classifier per task. A task is skipped unless it has at least
+    `min_examples` examples covering two or more labels, each with at least
+    `min_per_class` examples; rarer labels are dropped first.
+    """
+    classifiers = {}
+    for task, task_examples in feedback_examples(records).items():
+        counts = Counter(label for _, _, label in task_examples)
+        rare = sorted(label for label, count in counts.items() if count < min_per_class)
+        if rare:
+            print(f"{task}: dropping labels with fewer than {min_per_class} examples: {', '.join(rare)}")
+            task_examples = [example for example in task_examples if example[2] not in rare]
+        classes = sorted(set(counts) - set(rare))
+        if len(classes) < 2:
+            print(f"Skipping {task}: need at least 2 labels with {min_per_class}+ examples, have {len(classes)}")
+            continue
+        if len(task_examples) < min_examples:
+            print(f"Skipping {task}: only {len(task_examples)} labelled examples")
+            continue
+        labels = [label for _, _, label in task_examples]
+        classifier = HashedLinearClassifier(classes)
+        samples = [hashed_features(text, language) for text, language, _ in task_examples]
+        classifier.fit(samples, labels, epochs=epochs)
+        classifiers[task] = classifier
+        print(f"Trained {task} on {len(samples)} examples ({len(classifier.classes)} classes)")
+    return LocalModel(classifiers, version=time.strftime('%Y%m%d%H%M%S'))
+
+
+def main():
+    if len(sys.argv) != 4 or sys.argv[1] != 'train':
+        print(__doc__)
+        sys.exit(1)
+
+    with open(sys.argv[2], 'r', encoding='utf-8') as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    model = train(records)
+    if not model.classifiers:
+        print("Not enough feedback to train any classifier")
+        sys.exit(1)
+    model.save(sys.argv[3])
+    print(f"Saved model version {model.version} to {sys.argv[3]}")
+
+
+if __name__ == "__main__":
+    main()
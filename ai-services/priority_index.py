@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+JANMITRA AI Services - Priority Index
+Sorted per-ward/per-category index of open complaints by danger score
+"""
+
+import json
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Tuple
+
+# Bucket key: (ward, category); None acts as a wildcard
+BucketKey = Tuple[Optional[str], Optional[str]]
+
+
+class PriorityIndex:
+    """
+    Keeps every open complaint in four sorted buckets: (ward, category),
+    (ward, *), (*, category) and (*, *).
+
+    Buckets hold `(-score, complaint_id)` tuples in ascending order, so the top
+    K complaints of any bucket are simply its first K entries and no rescoring
+    or scanning is needed to answer a query.
+    """
+
+    def __init__(self):
+        self._buckets: Dict[BucketKey, List[Tuple[float, str]]] = {}
+        self._entries: Dict[str, Tuple[float, Optional[str], Optional[str]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, complaint_id: str) -> bool:
+        return complaint_id in self._entries
+
+    @staticmethod
+    def _bucket_keys(ward: Optional[str], category: Optional[str]) -> List[BucketKey]:
+        keys = [(None, None)]
+        if ward:
+            keys.append((ward, None))
+        if category:
+            keys.append((None, category))
+        if ward and category:
+            keys.append((ward, category))
+        return keys
+
+    def update(self, complaint_id: str, score: float,
+               ward: Optional[str] = None, category: Optional[str] = None) -> None:
+        """Insert a complaint or move it to its new score/ward/category"""
+        category = category.lower() if category else None
+        current = self._entries.get(complaint_id)
+        if current == (score, ward, category):
+            return
+        if current is not None:
+            self.remove(complaint_id)
+
+        item = (-score, complaint_id)
+        for key in self._bucket_keys(ward, category):
+            insort(self._buckets.setdefault(key, []), item)
+        self._entries[complaint_id] = (score, ward, category)
+
+    def remove(self, complaint_id: str) -> bool:
+        """Drop a complaint (e.g. once resolved). Returns False if it was not indexed"""
+        current = self._entries.pop(complaint_id, None)
+        if current is None:
+            return False
+
+        score, ward, category = current
+        item = (-score, complaint_id)
+        for key in self._bucket_keys(ward, category):
+            bucket = self._buckets[key]
+            position = bisect_left(bucket, item)
+            if position < len(bucket) and bucket[position] == item:
+                del bucket[position]
+            if not bucket:
+                del self._buckets[key]
+        return True
+
+    def top(self, k: int = 10, ward: Optional[str] = None,
+            category: Optional[str] = None) -> List[Tuple[str, float]]:
+        """Return up to `k` (complaint_id, score) pairs, most dangerous first"""
+        key = (ward or None, category.lower() if category else None)
+        bucket = self._buckets.get(key, [])
+        return [(complaint_id, -neg_score) for neg_score, complaint_id in bucket[:k]]
+
+
+class RedisPriorityIndex:
+    """
+    PriorityIndex backed by Redis sorted sets, so every worker process and
+    replica ranks the same complaints.
+
+    Each bucket is a sorted set `<prefix>:<ward|*>:<category|*>` scored by
+    `-score`, so ZRANGE returns the most dangerous complaints first with ties
+    broken by id, as in PriorityIndex. `<prefix>:entry:<id>` holds each
+    complaint's current (score, ward, category) so it can be moved or
+    removed. Updates are WATCH/MULTI transactions on that entry key, so two
+    workers moving the same complaint can't leave it in a stale bucket.
+    """
+
+    def __init__(self, client, prefix: str = 'ai:priority'):
+        self.client = client
+        self.prefix = prefix
+
+    def __len__(self) -> int:
+        # Every indexed complaint is in the (*, *) bucket
+        return self.client.zcard(self._key((None, None)))
+
+    def __contains__(self, complaint_id: str) -> bool:
+        return bool(self.client.exists(self._entry_key(complaint_id)))
+
+    def _key(self, bucket: BucketKey) -> str:
+        ward, category = bucket
+        return f"{self.prefix}:{ward or '*'}:{category or '*'}"
+
+    def _entry_key(self, complaint_id: str) -> str:
+        return f"{self.prefix}:entry:{complaint_id}"
+
+    def _read_entry(self, client, complaint_id: str) -> Optional[Tuple[float, Optional[str], Optional[str]]]:
+        raw = client.get(self._entry_key(complaint_id))
+        return tuple(json.loads(raw)) if raw else None
+
+    def update(self, complaint_id: str, score: float,
+               ward: Optional[str] = None, category: Optional[str] = None) -> None:
+        """Insert a complaint or move it to its new score/ward/category"""
+        category = category.lower() if category else None
+
+        def transaction(pipe) -> None:
+            current = self._read_entry(pipe, complaint_id)
+            if current == (score, ward, category):
+                return
+            pipe.multi()
+            if current is not None:
+                for bucket in PriorityIndex._bucket_keys(current[1], current[2]):
+                    pipe.zrem(self._key(bucket), complaint_id)
+            for bucket in PriorityIndex._bucket_keys(ward, category):
+                pipe.zadd(self._key(bucket), {complaint_id: -score})
+            pipe.set(self._entry_key(complaint_id), json.dumps([score, ward, category]))
+
+        self.client.transaction(transaction, self._entry_key(complaint_id))
+
+    def remove(self, complaint_id: str) -> bool:
+        """Drop a complaint (e.g. once resolved). Returns False if it was not indexed"""
+        def transaction(pipe) -> bool:
+            current = self._read_entry(pipe, complaint_id)
+            if current is None:
+                return False
+            pipe.multi()
+            for bucket in PriorityIndex._bucket_keys(current[1], current[2]):
+                pipe.zrem(self._key(bucket), complaint_id)
+            pipe.delete(self._entry_key(complaint_id))
+            return True
+
+        return self.client.transaction(transaction, self._entry_key(complaint_id), value_from_callable=True)
+
+    def top(self, k: int = 10, ward: Optional[str] = None,
+            category: Optional[str] = None) -> List[Tuple[str, float]]:
+        """Return up to `k` (complaint_id, score) pairs, most dangerous first"""
+        key = self._key((ward or None, category.lower() if category else None))
+        return [
+            (complaint_id, -neg_score)
+            for complaint_id, neg_score in self.client.zrange(key, 0, k - 1, withscores=True)
+        ]
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+JANMITRA AI Services - Incremental Re-scoring
+Keeps per-complaint score components and updates priorities from change events
+"""
+
+import math
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# Bonus points per risk level, mirroring backend/utils/calculatePriority.js
+RISK_LEVEL_BONUS = {
+    'low': 0,
+    'medium': 10,
+    'high': 30,
+    'critical': 50
+}
+
+# Statuses after which a complaint no longer needs prioritizing
+CLOSED_STATUSES = {'resolved', 'closed', 'rejected', 'duplicate'}
+
+EVENT_TYPES = {'created', 'upvote', 'media_added', 'status_change', 'user_history'}
+
+
+def clamp_danger_score(score: Optional[float]) -> float:
+    """Clamp a danger score to the 0-10 scale used by calculatePriority"""
+    return min(10.0, max(0.0, float(score or 0.0)))
+
+
+class ScoreComponents:
+    """
+    Score components for a single complaint.
+
+    Each component is stored separately so an event only recomputes the part
+    it affects; `priority` is the clamped sum.
+    """
+
+    __slots__ = (
+        'complaint_id', 'category', 'ward', 'status',
+        'danger_score', 'risk_level', 'upvotes', 'media_count', 'previous_complaints',
+        'danger_component', 'upvote_component', 'media_component', 'history_component',
+    )
+
+    def __init__(self, complaint_id: str):
+        self.complaint_id = complaint_id
+        self.category = 'other'
+        self.ward: Optional[str] = None
+        self.status = 'open'
+        self.danger_score = 0.0
+        self.risk_level = 'low'
+        self.upvotes = 0
+        self.media_count = 0
+        self.previous_complaints = 0
+        self.danger_component = 0.0
+        self.upvote_component = 0.0
+        self.media_component = 0.0
+        self.history_component = 0.0
+
+    @property
+    def is_open(self) -> bool:
+        return self.status not in CLOSED_STATUSES
+
+    @property
+    def priority(self) -> int:
+        total = (self.danger_component + self.upvote_component +
+                 self.media_component + self.history_component)
+        return min(100, max(0, round(total)))
+
+    def update_danger(self, danger_score: float, risk_level: str) -> None:
+        self.danger_score = clamp_danger_score(danger_score)
+        self.risk_level = risk_level
+        self.danger_component = self.danger_score * 10 + RISK_LEVEL_BONUS.get(risk_level, 0)
+
+    def update_upvotes(self, upvotes: int) -> None:
+        self.upvotes = max(0, upvotes)
+        # Diminishing returns so that popular complaints can't drown out danger
+        self.upvote_component = min(15.0, 5 * math.log2(1 + self.upvotes))
+
+    def update_media(self, media_count: int) -> None:
+        self.media_count = max(0, media_count)
+        self.media_component = min(5.0, 2.0 * self.media_count)
+
+    def update_history(self, previous_complaints: int) -> None:
+        self.previous_complaints = max(0, previous_complaints)
+        self.history_component = min(5.0, float(self.previous_complaints))
+
+    def state(self) -> Dict[str, Any]:
+        """Raw inputs from which every component can be recomputed (for storage)"""
+        return {
+            'category': self.category,
+            'ward': self.ward or '',
+            'status': self.status,
+            'danger_score': self.danger_score,
+            'risk_level': self.risk_level,
+            'upvotes': self.upvotes,
+            'media_count': self.media_count,
+            'previous_complaints': self.previous_complaints,
+        }
+
+    @classmethod
+    def from_state(cls, complaint_id: str, state: Dict[str, Any]) -> 'ScoreComponents':
+        record = cls(complaint_id)
+        record.category = state.get('category') or 'other'
+        record.ward = state.get('ward') or None
+        record.status = state.get('status') or 'open'
+        record.update_danger(float(state.get('danger_score') or 0.0), state.get('risk_level') or 'low')
+        record.update_upvotes(int(state.get('upvotes') or 0))
+        record.update_media(int(state.get('media_count') or 0))
+        record.update_history(int(state.get('previous_complaints') or 0))
+        return record
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'complaint_id': self.complaint_id,
+            'priority': self.priority,
+            'danger_score': self.danger_score,
+            'risk_level': self.risk_level,
+            'category': self.category,
+            'ward': self.ward,
+            'status': self.status,
+        }
+
+
+class RescoringEngine:
+    """
+    Applies complaint change events to stored score components.
+
+    Only the records an event touches are recomputed, and `updates_for()`
+    reports just those, so the cost of re-prioritizing scales with the number
+    of changes rather than the size of the corpus.
+
+    Closed complaints keep their record, so re-scoring one later does not
+    reopen it; only a `status_change` event back to an open status does.
+    """
+
+    def __init__(self):
+        self.complaints: Dict[str, ScoreComponents] = {}
+
+    def __len__(self) -> int:
+        return len(self.complaints)
+
+    def get(self, complaint_id: str) -> Optional[ScoreComponents]:
+        return self.complaints.get(complaint_id)
+
+    def _save(self, record: ScoreComponents) -> None:
+        self.complaints[record.complaint_id] = record
+
+    def _update(self, complaint_id: str, change: Callable[[ScoreComponents], None],
+                create: bool = False) -> Optional[ScoreComponents]:
+        """
+        Apply `change` to a complaint's record and save it. A missing record
+        is created when `create` is set, otherwise None is returned.
+        """
+        record = self.get(complaint_id)
+        if record is None:
+            if not create:
+                return None
+            record = ScoreComponents(complaint_id)
+        change(record)
+        self._save(record)
+        return record
+
+    def upsert(self, complaint_id: str, danger_score: float, risk_level: str,
+               category: Optional[str] = None, ward: Optional[str] = None,
+               upvotes: Optional[int] = None, media_count: Optional[int] = None,
+               previous_complaints: Optional[int] = None) -> ScoreComponents:
+        """Register a freshly scored complaint or refresh its danger component"""
+        def change(record: ScoreComponents) -> None:
+            if category:
+                record.category = category.lower()
+            if ward:
+                record.ward = ward
+            record.update_danger(danger_score, risk_level)
+            if upvotes is not None:
+                record.update_upvotes(upvotes)
+            if media_count is not None:
+                record.update_media(media_count)
+            if previous_complaints is not None:
+                record.update_history(previous_complaints)
+
+        return self._update(complaint_id, change, create=True)
+
+    def apply(self, event: Dict[str, Any]) -> Optional[ScoreComponents]:
+        """
+        Apply a single change event.
+
+        Returns the updated record, or None if the event refers to a complaint
+        that has never been scored (there is nothing to update incrementally).
+        """
+        event_type = event.get('type')
+        if event_type not in EVENT_TYPES:
+            raise ValueError(f"Unknown event type: {event_type}")
+
+        complaint_id = event['complaint_id']
+        if event_type == 'created':
+            return self.upsert(
+                complaint_id,
+                danger_score=event.get('danger_score') or 0.0,
+                risk_level=event.get('risk_level') or 'low',
+                category=event.get('category'),
+                ward=event.get('ward'),
+                upvotes=event.get('upvotes'),
+                media_count=event.get('media_count'),
+                previous_complaints=event.get('previous_complaints'),
+            )
+
+        def change(record: ScoreComponents) -> None:
+            if event_type == 'upvote':
+                if event.get('upvotes') is not None:
+                    record.update_upvotes(event['upvotes'])
+                else:
+                    record.update_upvotes(record.upvotes + event.get('delta', 1))
+            elif event_type == 'media_added':
+                if event.get('media_count') is not None:
+                    record.update_media(event['media_count'])
+                else:
+                    record.update_media(record.media_count + event.get('delta', 1))
+            elif event_type == 'user_history':
+                record.update_history(event.get('previous_complaints') or 0)
+            elif event_type == 'status_change':
+                record.status = (event.get('status') or record.status).lower()
+
+        return self._update(complaint_id, change)
+
+    def apply_many(self, events: Iterable[Dict[str, Any]]) -> List[ScoreComponents]:
+        """Apply a batch of events and return the distinct records they touched"""
+        touched: Dict[str, ScoreComponents] = {}
+        for event in events:
+            record = self.apply(event)
+            if record is not None:
+                touched[record.complaint_id] = record
+        return list(touched.values())
+
+    def updates_for(self, records: Iterable[ScoreComponents]) -> List[Dict[str, Any]]:
+        """Return the current priority and status of each record"""
+        return [record.to_dict() for record in records]
+
+
+class RedisRescoringEngine(RescoringEngine):
+    """
+    RescoringEngine whose records live in Redis hashes (`<prefix>:<id>`), so
+    an event can be applied by any worker process or replica, not only the
+    one that scored the complaint. Records expire after `ttl` seconds without
+    changes.
+
+    Each update is a WATCH/MULTI transaction on the record's key, retried if
+    another worker changed the record in between, so concurrent events (two
+    upvote deltas, say) are never lost.
+    """
+
+    def __init__(self, client, prefix: str = 'ai:rescoring', ttl: int = 30 * 24 * 3600):
+        super().__init__()
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def _key(self, complaint_id: str) -> str:
+        return f"{self.prefix}:{complaint_id}"
+
+    def get(self, complaint_id: str) -> Optional[ScoreComponents]:
+        state = self.client.hgetall(self._key(complaint_id))
+        return ScoreComponents.from_state(complaint_id, state) if state else None
+
+    def _update(self, complaint_id: str, change: Callable[[ScoreComponents], None],
+                create: bool = False) -> Optional[ScoreComponents]:
+        key = self._key(complaint_id)
+
+        def transaction(pipe) -> Optional[ScoreComponents]:
+            # Reads run immediately while the key is watched
+            state = pipe.hgetall(key)
+            if not state and not create:
+                return None
+            record = ScoreComponents.from_state(complaint_id, state) if state else ScoreComponents(complaint_id)
+            change(record)
+            pipe.multi()
+            pipe.hset(key, mapping=record.state())
+            pipe.expire(key, self.ttl)
+            return record
+
+        return self.client.transaction(transaction, key, value_from_callable=True)
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+JANMITRA AI Services - Result Cache
+Content-addressed LRU memo for deterministic rule-based results
+"""
+
+import atexit
+import hashlib
+import json
+import logging
+import os
+import signal
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Sentinel so that cached falsy values (0.0, '') still count as hits
+_MISSING = object()
+
+
+def content_key(*parts: str) -> str:
+    """
+    Build a fast content-addressed key from already-normalized parts
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Bounded LRU cache for pure functions of normalized complaint text.
+
+    Entries are keyed by `content_key(...)`, so the same complaint text always
+    maps to the same slot. When `path` is given the cache can be saved to and
+    reloaded from a JSON file, letting warm results survive restarts. The
+    `version` is stored alongside the entries; a file written by a different
+    rules version is ignored on load. `persist_on_shutdown()` saves it on
+    exit, on SIGTERM and periodically.
+    """
+
+    def __init__(self, max_entries: int = 10000, path: Optional[str] = None, version: str = '1'):
+        self.max_entries = max_entries
+        self.path = path
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[str, Any]' = OrderedDict()
+        self._lock = threading.Lock()
+        # Set when entries change, cleared once they are saved
+        self._dirty = False
+        self._stop_autosave = threading.Event()
+        if path:
+            self.load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            value = self._entries.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._dirty = True
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any]) -> Any:
+        """
+        Return the cached value for `key`, computing and storing it on a miss
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self._dirty = True
+
+    def stats(self) -> dict:
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+    def load(self) -> None:
+        """Load persisted entries, ignoring missing, corrupt or stale files"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                payload = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not load result cache from {self.path}: {e}")
+            return
+
+        if payload.get('version') != self.version:
+            logger.info(f"Discarding result cache {self.path}: rules version changed")
+            return
+
+        with self._lock:
+            for key, value in payload.get('entries', []):
+                # Persisted tuples come back as lists
+                self._entries[key] = tuple(value) if isinstance(value, list) else value
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def save(self) -> None:
+        """Persist entries (in LRU order) to `path` atomically"""
+        if not self.path:
+            return
+        with self._lock:
+            payload = {'version': self.version, 'entries': list(self._entries.items())}
+            self._dirty = False
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(payload, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            self._dirty = True
+            logger.warning(f"Could not save result cache to {self.path}: {e}")
+
+    def save_if_changed(self) -> None:
+        if self._dirty:
+            self.save()
+
+    def start_autosave(self, interval_seconds: float) -> None:
+        """Save every `interval_seconds` if entries changed, from a daemon thread"""
+        if not self.path or interval_seconds <= 0:
+            return
+
+        def run() -> None:
+            while not self._stop_autosave.wait(interval_seconds):
+                self.save_if_changed()
+
+        self._stop_autosave.clear()
+        threading.Thread(target=run, name='result-cache-autosave', daemon=True).start()
+
+    def stop_autosave(self) -> None:
+        self._stop_autosave.set()
+
+    def persist_on_shutdown(self, autosave_seconds: float = 300.0) -> None:
+        """
+        Save on interpreter exit, on SIGTERM and every `autosave_seconds`.
+
+        SIGTERM (what `docker stop` sends) kills Python without running atexit
+        hooks, so it is turned into a normal exit; an existing SIGTERM handler
+        (e.g. a process manager's) is called after saving instead. The
+        autosave bounds what a SIGKILL can lose. Signal handlers can only be
+        installed from the main thread; elsewhere only the other two apply.
+        """
+        if not self.path:
+            return
+        atexit.register(self.save_if_changed)
+        self.start_autosave(autosave_seconds)
+        if threading.current_thread() is not threading.main_thread():
+            logger.warning("Result cache: SIGTERM handler not installed outside the main thread")
+            return
+
+        previous = signal.getsignal(signal.SIGTERM)
+
+        def on_sigterm(signum, frame):
+            if callable(previous):
+                self.save_if_changed()
+                previous(signum, frame)
+            else:
+                # Unwind normally so that the atexit hook saves
+                raise SystemExit(128 + signum)
+
+        signal.signal(signal.SIGTERM, on_sigterm)
@@ -0,0 +1,187 @@
+import asyncio
+
+import pytest
+
+from admission import AdmissionController, Overloaded, RateLimited, TokenBucket
+
+
+async def settle():
+    # Let waiting tasks run until they block again
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+class Holder:
+    """Keeps an admitted slot until released, recording when it got in"""
+
+    def __init__(self, controller, high_risk, name, order):
+        self.release = asyncio.Event()
+        self.admission = None
+        self.task = asyncio.create_task(self._run(controller, high_risk, name, order))
+
+    async def _run(self, controller, high_risk, name, order):
+        async with controller.admit(high_risk) as admission:
+            self.admission = admission
+            order.append(name)
+            await self.release.wait()
+
+    async def finish(self):
+        self.release.set()
+        await self.task
+
+
+@pytest.mark.asyncio
+async def test_high_risk_waiters_go_first():
+    controller = AdmissionController(max_concurrency=2, high_risk_reserve=1)
+    order = []
+    running = [Holder(controller, True, f'running-{i}', order) for i in range(2)]
+    await settle()
+
+    low = Holder(controller, False, 'low', order)
+    await settle()
+    high = Holder(controller, True, 'high', order)
+    await settle()
+    assert controller.waiting == {'high': 1, 'low': 1}
+
+    await running[0].finish()
+    await settle()
+    assert order[-1] == 'high'
+    assert controller.waiting == {'high': 0, 'low': 1}
+
+    # The free slot is the reserved one, so low risk still waits
+    await running[1].finish()
+    await settle()
+    assert order[-1] == 'high'
+    await high.finish()
+    await settle()
+    assert order[-1] == 'low'
+    await low.finish()
+    assert controller.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_reserved_slots_are_kept_for_high_risk():
+    controller = AdmissionController(max_concurrency=3, high_risk_reserve=1)
+    order = []
+    holders = [Holder(controller, False, f'low-{i}', order) for i in range(3)]
+    await settle()
+    assert order == ['low-0', 'low-1']
+    assert controller.waiting['low'] == 1
+
+    holders.append(Holder(controller, True, 'high', order))
+    await settle()
+    assert order[-1] == 'high'
+    assert controller.in_flight == 3
+
+    for holder in holders:
+        await holder.finish()
+    assert order[-1] == 'low-2'
+    assert controller.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_low_risk_degrades_then_sheds_on_queue_length():
+    controller = AdmissionController(max_concurrency=1, high_risk_reserve=0,
+                                     degrade_queue=1, shed_queue=2)
+    order = []
+    holders = [Holder(controller, False, 'running', order)]
+    await settle()
+    holders += [Holder(controller, False, f'queued-{i}', order) for i in range(2)]
+    await settle()
+    assert controller.waiting['low'] == 2
+
+    with pytest.raises(Overloaded) as exc_info:
+        async with controller.admit(False):
+            pass
+    assert not isinstance(exc_info.value, RateLimited)
+    assert exc_info.value.retry_after >= 1
+    assert controller.shed_count == 1
+
+    # High risk is never degraded or shed
+    holders.append(Holder(controller, True, 'high', order))
+    await settle()
+    assert controller.waiting['high'] == 1
+
+    # Released in the order they are admitted: the high-risk waiter goes first
+    running, queued, degraded, high = holders
+    for holder in (running, high, queued, degraded):
+        await holder.finish()
+    assert order == ['running', 'high', 'queued-0', 'queued-1']
+    assert [h.admission.degraded for h in holders] == [False, False, True, False]
+    assert controller.stats()['degraded'] == 1
+
+
+@pytest.mark.asyncio
+async def test_latency_only_counts_while_saturated():
+    controller = AdmissionController(max_concurrency=2, high_risk_reserve=1,
+                                     degrade_latency=1.0, shed_latency=4.0)
+    controller.latency_ewma = 5.0
+
+    # Idle: a stale latency average must not shed or degrade
+    async with controller.admit(False) as admission:
+        assert not admission.degraded
+        # Saturated: the same average sheds the next low-risk request
+        with pytest.raises(Overloaded):
+            async with controller.admit(False):
+                pass
+
+    controller.latency_ewma = 2.0
+    order = []
+    holder = Holder(controller, False, 'running', order)
+    await settle()
+    degraded = Holder(controller, False, 'degraded', order)
+    await settle()
+    await holder.finish()
+    await degraded.finish()
+    assert degraded.admission.degraded
+
+
+@pytest.mark.asyncio
+async def test_lanes_have_separate_rate_buckets():
+    controller = AdmissionController(low_risk_rate=2, high_risk_rate=5)
+    for _ in range(2):
+        async with controller.admit(False):
+            pass
+    with pytest.raises(RateLimited) as exc_info:
+        async with controller.admit(False):
+            pass
+    assert exc_info.value.retry_after >= 1
+
+    for _ in range(5):
+        async with controller.admit(True):
+            pass
+    with pytest.raises(RateLimited):
+        async with controller.admit(True):
+            pass
+
+    stats = controller.stats()
+    assert stats['rate_limited'] == 2
+    assert stats['in_flight'] == 0
+    assert stats['waiting_low_risk'] == stats['waiting_high_risk'] == 0
+
+
+@pytest.mark.asyncio
+async def test_rate_limits_are_optional():
+    controller = AdmissionController()
+    for _ in range(100):
+        async with controller.admit(False):
+            pass
+    assert controller.rate_limited_count == 0
+
+
+def test_token_bucket_refills(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr('admission.time.monotonic', lambda: now[0])
+    bucket = TokenBucket(rate=60, period=60.0, burst=2)
+    assert bucket.try_acquire()
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+    assert bucket.retry_after() == 1
+
+    now[0] += 1.0
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+
+    now[0] += 60.0
+    assert bucket.try_acquire() and bucket.try_acquire()
+    assert not bucket.try_acquire()
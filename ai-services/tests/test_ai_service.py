@@ -0,0 +1,340 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+from fastapi import BackgroundTasks
+from fastapi.testclient import TestClient
+
+import ai_service
+from admission import AdmissionController
+from priority_index import PriorityIndex, RedisPriorityIndex
+from rescoring import RedisRescoringEngine, RescoringEngine
+
+
+@pytest.fixture
+def redis_server():
+    fakeredis = pytest.importorskip('fakeredis')
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture
+def redis_client(redis_server):
+    import fakeredis
+    return fakeredis.FakeRedis(server=redis_server, decode_responses=True)
+
+
+@pytest.fixture
+def cache_client(redis_server):
+    # Like the lifespan's: the same Redis, without decoding
+    import fakeredis
+    return fakeredis.FakeRedis(server=redis_server)
+
+
+@pytest.fixture(params=['memory', 'redis'])
+def client(request, monkeypatch, redis_client, cache_client):
+    # The lifespan hook is not run: no OpenAI client or local model, and the
+    # module-level state is replaced with fresh instances for each test. The
+    # priority state is held in memory or, as with Redis up, in Redis.
+    monkeypatch.setattr(ai_service, 'redis_client', redis_client)
+    monkeypatch.setattr(ai_service, 'cache_client', cache_client)
+    monkeypatch.setattr(ai_service, 'admission_controller', AdmissionController())
+    if request.param == 'memory':
+        monkeypatch.setattr(ai_service, 'rescoring_engine', RescoringEngine())
+        monkeypatch.setattr(ai_service, 'priority_index', PriorityIndex())
+    else:
+        monkeypatch.setattr(ai_service, 'rescoring_engine', RedisRescoringEngine(redis_client))
+        monkeypatch.setattr(ai_service, 'priority_index', RedisPriorityIndex(redis_client))
+    return TestClient(ai_service.app)
+
+
+def complaint(**overrides):
+    data = {
+        'description': 'Smoke coming out of the shop next to the market',
+        'category': 'fire',
+        'location': {'lat': 12.9716, 'lng': 77.5946},
+    }
+    data.update(overrides)
+    return data
+
+
+def cache_keys(redis_client, feature='danger_score'):
+    return redis_client.keys(f"ai_cache:*:{feature}:*")
+
+
+def test_category_is_stripped():
+    data = ai_service.ComplaintData(**complaint(category='  Fire '))
+    assert data.category == 'Fire'
+    with pytest.raises(ValueError):
+        ai_service.ComplaintData(**complaint(category=' a '))
+
+
+def test_padded_category_scores_and_caches_like_the_plain_one(client, redis_client):
+    padded = client.post('/api/ai/danger-score', json=complaint(category='fire '))
+    assert padded.status_code == 200
+    assert padded.json()['score'] == 9.5
+    assert padded.json()['risk_level'] == 'critical'
+
+    plain = client.post('/api/ai/danger-score', json=complaint(category='fire'))
+    assert plain.json() == padded.json()
+    assert len(cache_keys(redis_client)) == 1
+
+    other = client.post('/api/ai/danger-score', json=complaint(category='garbage'))
+    assert other.json()['score'] == 4.0
+    assert len(cache_keys(redis_client)) == 2
+
+
+# Valid but not as the service would encode it, so any re-encoding shows
+CACHED_BODY = (
+    '{"score": 6.5,  "risk_level": "high", '
+    '"factors": ["धुएँ की शिकायत"], "confidence": 0.9}'
+).encode('utf-8')
+
+
+def test_cache_hit_returns_the_stored_bytes(client, cache_client):
+    data = ai_service.ComplaintData(**complaint())
+    cache_client.set(ai_service.complaint_cache_key('danger_score', data), CACHED_BODY)
+    response = client.post('/api/ai/danger-score', json=complaint())
+    assert response.status_code == 200
+    assert response.content == CACHED_BODY
+
+
+@pytest.mark.asyncio
+async def test_degraded_cache_hit_notes_the_skipped_analysis(client, cache_client):
+    data = ai_service.ComplaintData(**complaint())
+    cache_client.set(ai_service.complaint_cache_key('danger_score', data, use_llm=False), CACHED_BODY)
+    response = await ai_service.score_admitted_complaint(None, data, BackgroundTasks(), degraded=True)
+    body = json.loads(response.body)
+    assert body['score'] == 6.5
+    assert body['factors'] == ['धुएँ की शिकायत', 'Rule-based only: AI analysis skipped under high load']
+
+
+def top_ids(client, **params):
+    response = client.get('/api/ai/priority/top', params=params)
+    assert response.status_code == 200
+    return [c['complaint_id'] for c in response.json()['complaints']]
+
+
+def test_scored_complaints_are_ranked_and_resolved_ones_stay_out(client):
+    tracked = complaint(additional_context={'complaint_id': 'c1', 'ward': 'w1'})
+    client.post('/api/ai/danger-score', json=tracked)
+    client.post('/api/ai/danger-score', json=complaint(
+        category='garbage', additional_context={'complaint_id': 'c2', 'ward': 'w1'}
+    ))
+    assert top_ids(client) == ['c1', 'c2']
+    assert top_ids(client, ward='w1', category='garbage') == ['c2']
+
+    response = client.post('/api/ai/events', json={'events': [
+        {'type': 'status_change', 'complaint_id': 'c1', 'status': 'resolved'},
+        {'type': 'upvote', 'complaint_id': 'unknown'},
+    ]})
+    body = response.json()
+    assert [u['complaint_id'] for u in body['updates']] == ['c1']
+    assert body['updates'][0]['status'] == 'resolved'
+    assert body['skipped'] == 1
+    assert top_ids(client) == ['c2']
+
+    # Scoring the resolved complaint again (a job, a prewarm or a retry) must not reopen it
+    client.post('/api/ai/danger-score', json=tracked)
+    assert top_ids(client) == ['c2']
+
+    client.post('/api/ai/events', json={'events': [
+        {'type': 'status_change', 'complaint_id': 'c1', 'status': 'open'}
+    ]})
+    assert top_ids(client) == ['c1', 'c2']
+
+
+@pytest.mark.parametrize('text, language', [
+    ('गैस रिसाव से खतरा', 'hi'),
+    ('गैस के रिसावों से खतरे', 'hi'),
+    ('gas risav se khatre', 'hi'),
+])
+def test_high_risk_keywords_in_hindi(text, language):
+    high_risk, keywords = ai_service.contains_high_risk_keywords(text, language)
+    assert high_risk
+    assert {'gas', 'leak', 'danger'} <= set(keywords)
+
+
+def test_prewarm_needs_redis(client, monkeypatch):
+    monkeypatch.setattr(ai_service, 'redis_client', None)
+    monkeypatch.setattr(ai_service, 'cache_client', None)
+    response = client.post('/api/ai/cache/prewarm', json={'complaints': [complaint()]})
+    assert response.status_code == 503
+
+
+def test_prewarm_caches_and_ranks_the_backlog(client, redis_client):
+    backlog = [
+        complaint(additional_context={'complaint_id': 'c1'}),
+        complaint(category='garbage', additional_context={'complaint_id': 'c2'}),
+    ]
+    response = client.post('/api/ai/cache/prewarm', json={'complaints': backlog})
+    assert response.status_code == 202
+    assert response.json()['queued'] == 2
+    assert len(cache_keys(redis_client)) == 2
+    assert top_ids(client) == ['c1', 'c2']
+
+
+@pytest.fixture
+def counted_scoring(monkeypatch, redis_client, cache_client):
+    """Pretend an LLM is configured and count the scoring calls it would get"""
+    calls = {'started': 0, 'running': 0, 'max_running': 0}
+
+    async def generate_danger_score(data):
+        calls['started'] += 1
+        calls['running'] += 1
+        calls['max_running'] = max(calls['max_running'], calls['running'])
+        await asyncio.sleep(0.01)
+        calls['running'] -= 1
+        return ai_service.DangerScoreResponse(score=4.0, risk_level='medium', factors=[], confidence=0.9)
+
+    monkeypatch.setattr(ai_service, 'redis_client', redis_client)
+    monkeypatch.setattr(ai_service, 'cache_client', cache_client)
+    monkeypatch.setattr(ai_service, 'rescoring_engine', RescoringEngine())
+    monkeypatch.setattr(ai_service, 'priority_index', PriorityIndex())
+    monkeypatch.setattr(ai_service.app.state, 'openai_client', object(), raising=False)
+    monkeypatch.setattr(ai_service, 'generate_danger_score', generate_danger_score)
+    return calls
+
+
+def backlog(n):
+    return [ai_service.ComplaintData(**complaint(description=f"Smoke coming out of shop number {i}"))
+            for i in range(n)]
+
+
+@pytest.mark.asyncio
+async def test_prewarm_concurrency_is_bounded(monkeypatch, counted_scoring):
+    monkeypatch.setattr(ai_service.settings, 'PREWARM_CONCURRENCY', 2)
+    monkeypatch.setattr(ai_service.settings, 'PREWARM_RATE_LIMIT', 6000)
+    await ai_service.prewarm_cache(backlog(6), ['danger_score'])
+    assert counted_scoring['started'] == 6
+    assert counted_scoring['max_running'] == 2
+
+
+@pytest.mark.asyncio
+async def test_prewarm_llm_misses_are_rate_limited(monkeypatch, counted_scoring, redis_client):
+    monkeypatch.setattr(ai_service.settings, 'PREWARM_CONCURRENCY', 2)
+    monkeypatch.setattr(ai_service.settings, 'PREWARM_RATE_LIMIT', 2)
+    complaints = backlog(5)
+    # Already cached complaints do not use up the budget
+    for data in complaints[:2]:
+        redis_client.set(ai_service.complaint_cache_key('danger_score', data), b'{}')
+
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(ai_service.prewarm_cache(complaints, ['danger_score']), timeout=0.5)
+    # Two cached, plus the two misses the burst allows; the fifth waits for a token
+    assert counted_scoring['started'] == 4
+
+
+class UnreachableRedis:
+    """A Redis whose ping hangs, like one behind a dropped connection"""
+
+    def __init__(self):
+        self.released = threading.Event()
+
+    def ping(self):
+        self.released.wait(5)
+
+
+@pytest.fixture
+def unreachable_redis(monkeypatch, tmp_path):
+    # Run the real lifespan without Redis, MongoDB, OpenAI or a local model,
+    # restoring the module state it replaces afterwards
+    redis = UnreachableRedis()
+    monkeypatch.setattr(ai_service, 'redis_from_url', lambda decode_responses=True: redis)
+    for name, value in [('ENVIRONMENT', 'test'), ('OPENAI_API_KEY', None), ('CONNECT_TIMEOUT', 0.2),
+                        ('LOCAL_MODEL_PATH', str(tmp_path / 'missing.npz')),
+                        ('JOB_QUEUE_PATH', str(tmp_path / 'jobs.db')), ('JOB_WORKERS', 1)]:
+        monkeypatch.setattr(ai_service.settings, name, value)
+    for name in ('mongo_client', 'redis_client', 'cache_client', 'rescoring_engine', 'priority_index'):
+        monkeypatch.setattr(ai_service, name, getattr(ai_service, name))
+    monkeypatch.setattr(ai_service, 'rescoring_engine', RescoringEngine())
+    monkeypatch.setattr(ai_service, 'priority_index', PriorityIndex())
+    monkeypatch.setattr(ai_service, 'admission_controller', AdmissionController())
+    for name in ('openai_client', 'local_model', 'job_pool', 'startup_timings'):
+        monkeypatch.setattr(ai_service.app.state, name, None, raising=False)
+    yield redis
+    redis.released.set()
+
+
+def test_startup_is_bounded_when_redis_is_unreachable(unreachable_redis, monkeypatch, caplog):
+    monkeypatch.setattr(ai_service.settings, 'STARTUP_BUDGET_SECONDS', 30.0)
+    started = time.perf_counter()
+    with TestClient(ai_service.app) as client:
+        assert time.perf_counter() - started < 2
+        assert ai_service.redis_client is None and ai_service.cache_client is None
+
+        timings = client.get('/health').json()['startup']
+        assert timings['budget_seconds'] == 30.0
+        assert 0.2 <= timings['lifespan_seconds'] < 2
+        assert timings['import_seconds'] >= 0
+
+        # Serves from process memory meanwhile
+        response = client.post('/api/ai/danger-score', json=complaint())
+        assert response.json()['score'] == 9.5
+        unreachable_redis.released.set()
+    assert 'over the' not in caplog.text
+
+
+def test_startup_over_budget_is_logged(unreachable_redis, monkeypatch, caplog):
+    monkeypatch.setattr(ai_service.settings, 'STARTUP_BUDGET_SECONDS', 0.1)
+    with caplog.at_level('WARNING', logger=ai_service.logger.name):
+        with TestClient(ai_service.app):
+            unreachable_redis.released.set()
+    assert 'over the 0.1s budget' in caplog.text
+
+
+class StubLocalModel:
+    """Returns fixed (label, probability) predictions per task"""
+
+    version = 'test'
+
+    def __init__(self, **predictions):
+        self.predictions = predictions
+
+    def predict(self, text, task, language='en'):
+        return self.predictions.get(task)
+
+
+@pytest.fixture
+def with_local_model(monkeypatch):
+    monkeypatch.setattr(ai_service, 'cache_client', None)
+    monkeypatch.setattr(ai_service.app.state, 'openai_client', None, raising=False)
+    monkeypatch.setattr(ai_service.settings, 'LOCAL_MODEL_CONFIDENCE', 0.85)
+
+    def install(**predictions):
+        monkeypatch.setattr(ai_service.app.state, 'local_model', StubLocalModel(**predictions), raising=False)
+
+    return install
+
+
+@pytest.mark.asyncio
+async def test_confident_local_risk_level_sets_the_level_and_clamps_the_score(with_local_model):
+    with_local_model(risk_level=('low', 0.9))
+    result = await ai_service.generate_danger_score(ai_service.ComplaintData(**complaint()))
+    assert result.risk_level == 'low'
+    assert result.score == 3.3
+    assert 'Local model assessment: low risk (0.90)' in result.factors
+
+
+@pytest.mark.asyncio
+async def test_unsure_local_model_is_ignored(with_local_model):
+    with_local_model(risk_level=('low', 0.6), category=('fire', 0.6))
+    result = await ai_service.generate_danger_score(ai_service.ComplaintData(**complaint()))
+    assert (result.score, result.risk_level) == (9.5, 'critical')
+
+    unknown = await ai_service.generate_danger_score(ai_service.ComplaintData(**complaint(category='misc')))
+    assert unknown.score == ai_service.CATEGORY_RISK_SCORES['other']
+    assert not any('local model' in factor.lower() for factor in unknown.factors)
+
+
+@pytest.mark.asyncio
+async def test_confident_local_category_replaces_an_unknown_one(with_local_model):
+    with_local_model(category=('fire', 0.95))
+    result = await ai_service.generate_danger_score(ai_service.ComplaintData(**complaint(category='misc')))
+    assert result.score == 9.5
+    assert 'Category inferred by local model: fire' in result.factors
+
+    # A known category is never overridden
+    garbage = await ai_service.generate_danger_score(ai_service.ComplaintData(**complaint(category='garbage')))
+    assert garbage.score == 4.0
@@ -0,0 +1,143 @@
+import random
+import threading
+
+from categorization import ComplaintCategorizer
+from duplicate_index import DuplicateIndex
+from text_normalization import normalize_text
+
+WORDS = ('road pothole water pipe leak fire gas wire light garbage drain tree park '
+         'sewer smell broken pole traffic signal school market bridge').split()
+
+
+def random_description(rng):
+    return ' '.join(rng.sample(WORDS, rng.randint(3, 8)))
+
+
+def expected_duplicates(corpus, description, threshold=0.3):
+    """Reference Jaccard scores computed straight from the normalized term sets"""
+    terms = normalize_text(description).terms
+    expected = {}
+    for complaint_id, text in corpus.items():
+        other = normalize_text(text).terms
+        similarity = len(terms & other) / len(terms | other)
+        if similarity > threshold:
+            expected[complaint_id] = round(similarity, 9)
+    return expected
+
+
+def scores(duplicates):
+    return {d['complaint_id']: round(d['similarity'], 9) for d in duplicates}
+
+
+def test_query_matches_brute_force():
+    rng = random.Random(0)
+    corpus = {i: random_description(rng) for i in range(300)}
+    index = DuplicateIndex()
+    for complaint_id, text in corpus.items():
+        index.add(complaint_id, text)
+
+    for _ in range(20):
+        description = random_description(rng)
+        assert scores(index.query(description)) == expected_duplicates(corpus, description)
+
+
+def test_results_are_sorted_and_limited():
+    index = DuplicateIndex()
+    index.add('exact', 'water pipe leak on main road')
+    index.add('close', 'water pipe leak on road')
+    index.add('far', 'garbage near park')
+
+    duplicates = index.query('water pipe leak on main road')
+    assert [d['complaint_id'] for d in duplicates] == ['exact', 'close']
+    assert duplicates[0]['similarity'] == 1.0
+    assert duplicates[0]['description'] == 'water pipe leak on main road'
+    assert len(index.query('water pipe leak on main road', limit=1)) == 1
+
+
+def test_compaction_preserves_query_results():
+    rng = random.Random(1)
+    corpus = {i: random_description(rng) for i in range(200)}
+    index = DuplicateIndex()
+    for complaint_id, text in corpus.items():
+        index.add(complaint_id, text)
+
+    # Removing most of the corpus triggers automatic compaction
+    for complaint_id in rng.sample(sorted(corpus), 150):
+        assert index.remove(complaint_id)
+        del corpus[complaint_id]
+    assert len(index) == len(corpus) == 50
+    assert index._dead_tokens * 2 <= len(index.tokens)
+
+    queries = [random_description(rng) for _ in range(20)]
+    before = [scores(index.query(q)) for q in queries]
+    index.compact()
+    assert None not in index.records
+    assert index._dead_tokens == 0
+    assert [scores(index.query(q)) for q in queries] == before
+    assert before == [expected_duplicates(corpus, q) for q in queries]
+
+
+def test_replacing_and_removing():
+    index = DuplicateIndex()
+    index.add('c1', 'water pipe leak')
+    index.add('c1', 'garbage near park')
+    assert len(index) == 1
+    assert index.query('water pipe leak') == []
+    assert scores(index.query('garbage near park')) == {'c1': 1.0}
+
+    assert index.remove('c1')
+    assert not index.remove('c1')
+    assert 'c1' not in index
+    assert index.query('garbage near park') == []
+
+
+def test_detect_duplicates_keeps_candidates_without_or_sharing_ids():
+    candidates = [
+        {'description': 'water pipe leaking on main road'},
+        {'description': 'garbage pile near park'},
+        {'complaint_id': 'a', 'description': 'water pipe leak road'},
+        {'complaint_id': 'a', 'description': 'water pipe leaking on the main road'},
+    ]
+    duplicates = ComplaintCategorizer().detect_duplicates('water pipe leaking on main road', candidates)
+    assert [(d['complaint_id'], d['description']) for d in duplicates] == [
+        (None, 'water pipe leaking on main road'),
+        ('a', 'water pipe leaking on the main road'),
+        ('a', 'water pipe leak road'),
+    ]
+
+
+def test_concurrent_add_remove_and_query():
+    rng = random.Random(2)
+    index = DuplicateIndex()
+    for i in range(2000):
+        index.add(i, random_description(rng))
+
+    errors = []
+
+    def writer(seed):
+        local = random.Random(seed)
+        try:
+            for i in range(1500):
+                complaint_id = (seed, i)
+                index.add(complaint_id, random_description(local))
+                index.remove(local.randrange(2000))
+                index.remove(complaint_id)
+        except Exception as e:
+            errors.append(e)
+
+    def reader():
+        try:
+            for _ in range(200):
+                index.query('water pipe leak broken road')
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(seed,)) for seed in (1, 2)]
+    threads += [threading.Thread(target=reader) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(index) == sum(record is not None for record in index.records)
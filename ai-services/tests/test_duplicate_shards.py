@@ -0,0 +1,197 @@
+import pytest
+
+from duplicate_shards import ShardRouter, geohash_encode, geohash_neighbors
+
+NODES = ['http://node-a', 'http://node-b', 'http://node-c']
+
+DESCRIPTION = 'water pipe leaking on the main road'
+
+
+class Cluster:
+    """Routers for every node, talking to each other in-process like app.py's endpoints"""
+
+    def __init__(self, nodes=NODES, down=()):
+        self.down = set(down)
+        self.routers = {node: ShardRouter(nodes, node, transport=self.transport) for node in nodes}
+
+    def transport(self, node, path, payload):
+        if node in self.down:
+            raise ConnectionError(f"{node} is down")
+        router = self.routers[node]
+        if path == '/duplicate-index':
+            for complaint in payload['complaints']:
+                router.add_local(router.shard_for(complaint), complaint, payload['language'])
+            return {'indexed': {'local': len(payload['complaints'])}}
+        if path == '/duplicate-index/remove':
+            if 'complaint_ids' in payload:
+                return {'removed': router.remove_local_many(payload['complaint_ids'])}
+            return {'removed': router.remove_local(payload['complaint_id'])}
+        if path == '/duplicate-index/query':
+            return {'duplicates': router.query_local(
+                payload['description'], payload['language'], payload['shards'],
+                payload['threshold'], payload['ward']
+            )}
+        raise AssertionError(path)
+
+    def holders(self, complaint_id):
+        return sorted(node for node, router in self.routers.items() if complaint_id in router._shard_of)
+
+
+def complaint(complaint_id, lat=None, lng=None, ward=None, description=DESCRIPTION):
+    data = {'complaint_id': complaint_id, 'description': description}
+    if lat is not None:
+        data['location'] = {'lat': lat, 'lng': lng}
+    if ward:
+        data['ward'] = ward
+    return data
+
+
+def location_owned_by(router, node):
+    """A coordinate whose precision-5 cell is owned by `node`"""
+    for i in range(1000):
+        lat, lng = 12.0 + i * 0.05, 77.0
+        cell = geohash_encode(lat, lng)
+        if router.owner(cell) == node:
+            return lat, lng
+    raise AssertionError(f"No cell found for {node}")
+
+
+def test_geohash_encode():
+    assert geohash_encode(57.64911, 10.40744, 11) == 'u4pruydqqvj'
+    assert geohash_encode(12.9716, 77.5946, 5) == 'tdr1v'
+
+
+def test_geohash_neighbors_cover_adjacent_cells():
+    cells = geohash_neighbors(12.9716, 77.5946)
+    assert len(cells) == 9
+    assert geohash_encode(12.9716, 77.5946) in cells
+    # A point just across a cell boundary is in one of the neighbors
+    assert geohash_encode(12.9716 + 0.045, 77.5946 + 0.045) in cells
+
+
+def test_shard_for_and_query_shards():
+    router = ShardRouter()
+    assert router.shard_for(complaint('c1', 12.9716, 77.5946, 'w1')) == 'tdr1v'
+    assert router.shard_for(complaint('c1', ward='w1')) == 'ward:w1'
+    assert router.shard_for(complaint('c1')) is None
+    assert router.query_shards('w1') is None
+    shards = router.query_shards('w1', 12.9716, 77.5946)
+    assert 'tdr1v' in shards and shards[-1] == 'ward:w1'
+
+
+def test_self_node_must_be_listed():
+    with pytest.raises(ValueError):
+        ShardRouter(NODES, 'http://elsewhere')
+
+
+def test_rendezvous_owner_only_moves_shards_to_new_nodes():
+    cells = [geohash_encode(12.0 + i * 0.05, 77.0) for i in range(200)]
+    before = ShardRouter(NODES[:2])
+    after = ShardRouter(NODES)
+    owners = {before.owner(cell) for cell in cells}
+    assert owners == set(NODES[:2])
+    for cell in cells:
+        assert after.owner(cell) in (before.owner(cell), NODES[2])
+
+
+def test_single_node_owns_everything():
+    router = ShardRouter()
+    counts = router.add_many([
+        complaint('c1', 12.9716, 77.5946, 'w1'),
+        complaint('c2', ward='w1'),
+        complaint('c3'),
+    ])
+    assert counts == {'local': 2, 'forwarded': 0, 'skipped': 1, 'failed': 0, 'failed_nodes': []}
+    assert [d['complaint_id'] for d in router.query(DESCRIPTION, lat=12.9716, lng=77.5946)] == ['c1']
+    assert sorted(d['complaint_id'] for d in router.query(DESCRIPTION, ward='w1')) == ['c1', 'c2']
+
+
+def test_complaints_are_routed_and_found_from_any_node():
+    cluster = Cluster()
+    entry = cluster.routers[NODES[0]]
+    complaints = [complaint(f"c{i}", 12.0 + i * 0.05, 77.0) for i in range(30)]
+    counts = entry.add_many(complaints)
+    assert counts['local'] + counts['forwarded'] == 30
+    assert counts['forwarded'] > 0 and counts['failed'] == 0
+
+    for c in complaints:
+        assert cluster.holders(c['complaint_id']) == [entry.owner(entry.shard_for(c))]
+
+    other = cluster.routers[NODES[1]]
+    for c in complaints[:5]:
+        location = c['location']
+        found = other.query(DESCRIPTION, lat=location['lat'], lng=location['lng'])
+        assert c['complaint_id'] in [d['complaint_id'] for d in found]
+    assert len(other.query(DESCRIPTION)) == 30
+
+
+def test_ward_filters_query_results():
+    router = ShardRouter()
+    router.add_many([
+        complaint('w1-complaint', 12.9716, 77.5946, 'w1'),
+        complaint('w2-complaint', 12.9716, 77.5946, 'w2'),
+        complaint('no-ward', 12.9716, 77.5946),
+    ])
+    found = router.query(DESCRIPTION, ward='w1', lat=12.9716, lng=77.5946)
+    assert sorted(d['complaint_id'] for d in found) == ['no-ward', 'w1-complaint']
+
+
+def test_moving_complaint_to_another_node_leaves_one_copy():
+    cluster = Cluster()
+    entry = cluster.routers[NODES[0]]
+    first = location_owned_by(entry, NODES[1])
+    second = location_owned_by(entry, NODES[2])
+
+    entry.add_many([complaint('x', *first)])
+    assert cluster.holders('x') == [NODES[1]]
+    entry.add_many([complaint('x', *second)])
+    assert cluster.holders('x') == [NODES[2]]
+
+    # Moving onto the entry node itself
+    third = location_owned_by(entry, NODES[0])
+    cluster.routers[NODES[1]].add_many([complaint('x', *third)])
+    assert cluster.holders('x') == [NODES[0]]
+
+    found = entry.query(DESCRIPTION)
+    assert [d['complaint_id'] for d in found] == ['x']
+
+
+def test_query_merges_copies_left_by_an_unreachable_node():
+    cluster = Cluster()
+    entry = cluster.routers[NODES[0]]
+    entry.add_many([complaint('x', *location_owned_by(entry, NODES[1]))])
+
+    cluster.down.add(NODES[1])
+    counts = entry.add_many([complaint('x', *location_owned_by(entry, NODES[2]))])
+    assert counts['failed'] == 0
+    assert cluster.holders('x') == [NODES[1], NODES[2]]
+
+    cluster.down.clear()
+    assert [d['complaint_id'] for d in entry.query(DESCRIPTION)] == ['x']
+
+
+def test_unreachable_node_is_reported_and_skipped():
+    cluster = Cluster(down={NODES[1]})
+    entry = cluster.routers[NODES[0]]
+    complaints = [
+        complaint('a', *location_owned_by(entry, NODES[0])),
+        complaint('b', *location_owned_by(entry, NODES[1])),
+        complaint('c', *location_owned_by(entry, NODES[2])),
+    ]
+    counts = entry.add_many(complaints)
+    assert counts['local'] == 1
+    assert counts['forwarded'] == 1
+    assert counts['failed'] == 1
+    assert counts['failed_nodes'] == [NODES[1]]
+
+    # Queries still answer from the reachable nodes
+    assert sorted(d['complaint_id'] for d in entry.query(DESCRIPTION)) == ['a', 'c']
+
+
+def test_remove_broadcasts():
+    cluster = Cluster()
+    entry = cluster.routers[NODES[0]]
+    entry.add_many([complaint('x', *location_owned_by(entry, NODES[2]))])
+    assert cluster.routers[NODES[1]].remove('x')
+    assert cluster.holders('x') == []
+    assert not entry.remove('x')
@@ -0,0 +1,305 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from job_queue import (
+    STALE_JOB_ERROR,
+    JobWorkerPool,
+    RedisStreamJobQueue,
+    SQLiteJobQueue,
+    callback_allowed,
+    new_job,
+)
+
+
+@pytest.fixture
+def sqlite_queue(tmp_path):
+    queue = SQLiteJobQueue(str(tmp_path / 'jobs.db'), max_attempts=2)
+    yield queue
+    queue.close()
+
+
+@pytest.fixture
+def redis_client():
+    fakeredis = pytest.importorskip('fakeredis')
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+def redis_queue(client, consumer, max_attempts=2):
+    return RedisStreamJobQueue(client, consumer=consumer, max_attempts=max_attempts)
+
+
+def wait_until_idle():
+    # Pending entries only count as stale once they have been idle for a while
+    time.sleep(0.02)
+
+
+def pending_count(queue):
+    return queue.client.xpending(queue.stream, queue.group)['pending']
+
+
+def test_sqlite_claim_and_complete(sqlite_queue):
+    first = new_job('danger_score', {'description': 'first'})
+    second = new_job('danger_score', {'description': 'second'})
+    second['created_at'] += 1
+    sqlite_queue.enqueue(second)
+    sqlite_queue.enqueue(first)
+
+    job = sqlite_queue.claim(block_seconds=0)
+    assert job['job_id'] == first['job_id']
+    assert job['status'] == 'running'
+    assert job['attempts'] == 1
+    assert sqlite_queue.depth() == 1
+
+    sqlite_queue.complete(job['job_id'], {'score': 4.5})
+    done = sqlite_queue.get(job['job_id'])
+    assert done['status'] == 'done'
+    assert done['result'] == {'score': 4.5}
+
+    job = sqlite_queue.claim(block_seconds=0)
+    sqlite_queue.fail(job['job_id'], 'boom')
+    assert sqlite_queue.get(second['job_id'])['error'] == 'boom'
+    assert sqlite_queue.claim(block_seconds=0) is None
+
+
+def test_sqlite_requeues_stale_jobs_until_out_of_attempts(sqlite_queue):
+    job = new_job('danger_score', {})
+    sqlite_queue.enqueue(job)
+
+    def interrupt():
+        claimed = sqlite_queue.claim(block_seconds=0)
+        assert claimed['job_id'] == job['job_id']
+        # The worker dies without finishing; pretend it claimed the job long ago
+        sqlite_queue._conn.execute('UPDATE jobs SET updated_at = updated_at - 600')
+
+    interrupt()
+    assert sqlite_queue.requeue_stale(older_than_seconds=300) == 1
+    assert sqlite_queue.get(job['job_id'])['status'] == 'queued'
+
+    interrupt()
+    assert sqlite_queue.requeue_stale(older_than_seconds=300) == 1
+    failed = sqlite_queue.get(job['job_id'])
+    assert failed['status'] == 'failed'
+    assert failed['error'] == STALE_JOB_ERROR
+    assert sqlite_queue.claim(block_seconds=0) is None
+
+
+def test_sqlite_does_not_requeue_recent_jobs(sqlite_queue):
+    sqlite_queue.enqueue(new_job('danger_score', {}))
+    job = sqlite_queue.claim(block_seconds=0)
+    assert sqlite_queue.requeue_stale(older_than_seconds=300) == 0
+    assert sqlite_queue.get(job['job_id'])['status'] == 'running'
+
+
+def test_redis_entry_stays_pending_until_finished(redis_client):
+    queue = redis_queue(redis_client, 'worker-1')
+    job = new_job('danger_score', {'description': 'x'})
+    queue.enqueue(job)
+
+    claimed = queue.claim(block_seconds=0)
+    assert claimed['job_id'] == job['job_id']
+    assert claimed['status'] == 'running'
+    assert claimed['attempts'] == 1
+    assert pending_count(queue) == 1
+    assert queue.claim(block_seconds=0) is None
+
+    queue.complete(job['job_id'], {'score': 7.0})
+    assert pending_count(queue) == 0
+    assert queue.depth() == 0
+    done = queue.get(job['job_id'])
+    assert done['status'] == 'done'
+    assert done['result'] == {'score': 7.0}
+
+
+def test_redis_fail_acknowledges(redis_client):
+    queue = redis_queue(redis_client, 'worker-1')
+    job = new_job('danger_score', {})
+    queue.enqueue(job)
+    queue.claim(block_seconds=0)
+    queue.fail(job['job_id'], 'boom')
+    assert pending_count(queue) == 0
+    assert queue.get(job['job_id'])['error'] == 'boom'
+
+
+def test_redis_skips_finished_jobs(redis_client):
+    queue = redis_queue(redis_client, 'worker-1')
+    job = new_job('danger_score', {})
+    job['status'] = 'done'
+    queue.enqueue(job)
+    assert queue.claim(block_seconds=0) is None
+    assert pending_count(queue) == 0
+
+
+def test_redis_recovers_jobs_of_dead_workers(redis_client):
+    dead = redis_queue(redis_client, 'dead-worker')
+    alive = redis_queue(redis_client, 'alive-worker')
+    job = new_job('danger_score', {})
+    dead.enqueue(job)
+    dead.claim(block_seconds=0)
+
+    # Not idle long enough yet
+    assert alive.requeue_stale(older_than_seconds=300) == 0
+    assert pending_count(alive) == 1
+
+    wait_until_idle()
+    assert alive.requeue_stale(older_than_seconds=0.01) == 1
+    assert alive.get(job['job_id'])['status'] == 'queued'
+    assert pending_count(alive) == 0
+
+    claimed = alive.claim(block_seconds=0)
+    assert claimed['job_id'] == job['job_id']
+    assert claimed['attempts'] == 2
+    alive.complete(job['job_id'], {'score': 1.0})
+    assert pending_count(alive) == 0
+    assert alive.get(job['job_id'])['status'] == 'done'
+
+
+def test_redis_fails_jobs_out_of_attempts(redis_client):
+    queue = redis_queue(redis_client, 'worker-1')
+    job = new_job('danger_score', {})
+    queue.enqueue(job)
+
+    queue.claim(block_seconds=0)
+    wait_until_idle()
+    assert queue.requeue_stale(older_than_seconds=0.01) == 1
+    queue.claim(block_seconds=0)
+    wait_until_idle()
+    assert queue.requeue_stale(older_than_seconds=0.01) == 1
+
+    failed = queue.get(job['job_id'])
+    assert failed['status'] == 'failed'
+    assert failed['error'] == STALE_JOB_ERROR
+    assert pending_count(queue) == 0
+    assert queue.claim(block_seconds=0) is None
+
+
+def test_redis_finished_job_is_not_requeued(redis_client):
+    queue = redis_queue(redis_client, 'worker-1')
+    job = new_job('danger_score', {})
+    queue.enqueue(job)
+    queue.claim(block_seconds=0)
+    # Finished, but the worker died before acknowledging
+    job = queue.get(job['job_id'])
+    job['status'] = 'done'
+    queue._save(job)
+
+    wait_until_idle()
+    assert queue.requeue_stale(older_than_seconds=0.01) == 0
+    assert pending_count(queue) == 0
+    assert queue.get(job['job_id'])['status'] == 'done'
+
+
+@pytest.mark.parametrize('url, allowed', [
+    ('http://backend:5000/api/complaints/ai-callback', True),
+    ('HTTP://Backend:5000/api/complaints/1', True),
+    ('https://backend:5000/api/complaints/1', False),
+    ('http://backend:5001/api/complaints/1', False),
+    ('http://backend:5000.evil.com/api/complaints/1', False),
+    ('http://user@backend:5000/api/complaints/1', False),
+    ('http://backend:5000/admin', False),
+    ('http://169.254.169.254/latest/meta-data', False),
+    ('not a url', False),
+])
+def test_callback_allowed(url, allowed):
+    assert callback_allowed(url, ['http://backend:5000/api/complaints/']) is allowed
+
+
+@pytest.mark.parametrize('url, allowed', [
+    ('http://backend:5000/api/ai-jobs', True),
+    ('http://backend:5000/api/ai-jobs/', True),
+    ('http://backend:5000/api/ai-jobs/job-1?x=1', True),
+    ('http://backend:5000/api/ai-jobs//job-1', True),
+    ('http://backend:5000/api/ai-jobs-evil', False),
+    ('http://backend:5000/api/ai-jobsx/job-1', False),
+    ('http://backend:5000/api/ai-jobs/../../admin/users', False),
+    ('http://backend:5000/api/ai-jobs/./job-1', False),
+    ('http://backend:5000/api/ai-jobs/%2e%2e/admin', False),
+    ('http://backend:5000/api/ai-jobs/..%2fadmin', False),
+    ('http://backend:5000/api/ai-jobs/..\\admin', False),
+    ('http://backend:5000/api', False),
+])
+@pytest.mark.parametrize('prefix', [
+    'http://backend:5000/api/ai-jobs',
+    'http://backend:5000/api/ai-jobs/',
+])
+def test_callback_paths_match_at_segment_boundaries(url, allowed, prefix):
+    assert callback_allowed(url, [prefix]) is allowed
+
+
+def test_host_only_prefix_allows_any_path():
+    assert callback_allowed('http://backend:5000/anything', ['http://backend:5000'])
+    assert not callback_allowed('http://backend:5000/a/../b', ['http://backend:5000/'])
+
+
+def test_callbacks_disabled_without_prefixes():
+    assert not callback_allowed('http://backend:5000/api/complaints/1', [])
+
+
+def test_submit_rejects_disallowed_callback(sqlite_queue):
+    async def handler(payload):
+        return payload
+
+    pool = JobWorkerPool(sqlite_queue, {'danger_score': handler},
+                         callback_prefixes=['http://backend:5000/api/'])
+    with pytest.raises(ValueError):
+        pool.submit('danger_score', {}, callback_url='http://169.254.169.254/')
+    with pytest.raises(ValueError):
+        pool.submit('unknown', {})
+    assert sqlite_queue.depth() == 0
+
+    job = pool.submit('danger_score', {}, callback_url='http://backend:5000/api/cb')
+    assert sqlite_queue.get(job['job_id'])['callback_url'] == 'http://backend:5000/api/cb'
+
+
+@pytest.mark.asyncio
+async def test_pool_runs_jobs(sqlite_queue):
+    async def handler(payload):
+        return {'score': payload['n'] * 2}
+
+    pool = JobWorkerPool(sqlite_queue, {'danger_score': handler}, concurrency=2, poll_seconds=0.05)
+    job = pool.submit('danger_score', {'n': 3})
+    pool.start()
+    try:
+        for _ in range(100):
+            if sqlite_queue.get(job['job_id'])['status'] == 'done':
+                break
+            await asyncio.sleep(0.02)
+    finally:
+        await pool.stop()
+    assert sqlite_queue.get(job['job_id'])['result'] == {'score': 6}
+
+
+class BlockingQueue:
+    """A queue whose claims block until released, like an idle Redis XREADGROUP"""
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def claim(self, block_seconds):
+        self.release.wait()
+        return None
+
+    def requeue_stale(self, older_than_seconds):
+        self.release.wait()
+        return 0
+
+
+@pytest.mark.asyncio
+async def test_blocked_claims_leave_the_default_executor_free():
+    loop = asyncio.get_running_loop()
+    default_executor = ThreadPoolExecutor(max_workers=2)
+    loop.set_default_executor(default_executor)
+    queue = BlockingQueue()
+    pool = JobWorkerPool(queue, {}, concurrency=4, poll_seconds=0.01)
+    pool.start()
+    try:
+        await asyncio.sleep(0.05)
+        # Request handlers still get a thread while every worker waits in claim
+        assert await asyncio.wait_for(asyncio.to_thread(lambda: 'ok'), timeout=1) == 'ok'
+    finally:
+        queue.release.set()
+        await pool.stop()
+        default_executor.shutdown()
@@ -0,0 +1,80 @@
+import numpy as np
+
+from local_classifier import HashedLinearClassifier, LocalModel, feedback_examples, hashed_features, train
+
+FIRE = ['Fire in the market, smoke everywhere', 'Shop is burning and smoke is spreading',
+        'Flames coming out of the transformer', 'Huge fire near the bus stand with thick smoke',
+        'Burning garbage heap has caught fire']
+WATER = ['Water pipe leaking on the main road', 'Broken pipe flooding the lane with water',
+         'No water supply since morning, pipe burst', 'Leaking water tank near the school',
+         'Drinking water pipe is leaking badly']
+
+
+def record(description, category, risk_level, feedback_type='positive', corrections=None):
+    return {'description': description, 'category': category, 'risk_level': risk_level,
+            'feedback_type': feedback_type, 'corrections': corrections, 'language': 'en'}
+
+
+def records(repeat=2):
+    return ([record(text, 'fire', 'critical') for text in FIRE] * repeat +
+            [record(text, 'water', 'medium') for text in WATER] * repeat)
+
+
+def test_feedback_examples_use_corrections_and_positive_labels():
+    examples = feedback_examples([
+        record('Fire in the market', 'fire', 'critical'),
+        record('Water pipe leaking', 'fire', 'high', 'negative', {'category': 'Water'}),
+        record('Streetlight is off', 'street_light', 'low', 'negative'),
+        record('', 'fire', 'critical'),
+    ])
+    assert examples['category'] == [('Fire in the market', 'en', 'fire'), ('Water pipe leaking', 'en', 'water')]
+    assert examples['risk_level'] == [('Fire in the market', 'en', 'critical')]
+
+
+def test_hashed_features_are_stable_and_unique():
+    features = hashed_features('leaking pipe leaking pipe')
+    assert list(features) == sorted(set(features))
+    assert np.array_equal(features, hashed_features('Leaking pipes, leaking pipes!'))
+
+
+def test_trained_model_predicts_each_task():
+    model = train(records(), min_examples=10)
+    assert set(model.classifiers) == {'category', 'risk_level'}
+    label, probability = model.predict('Smoke and fire at the shop', 'category')
+    assert label == 'fire' and probability > 0.5
+    assert model.predict('Pipe leaking water on the road', 'risk_level')[0] == 'medium'
+
+
+def test_tasks_without_two_well_sampled_labels_are_skipped():
+    data = records() + [record('Open manhole on the road', 'road', 'high')]
+    for r in data:
+        r['risk_level'] = 'high'
+    model = train(data, min_examples=10)
+    # One risk level only, and 'road' has too few examples to be a class
+    assert 'risk_level' not in model.classifiers
+    assert model.classifiers['category'].classes == ['fire', 'water']
+
+
+def test_tasks_with_too_few_examples_are_skipped():
+    assert train(records(repeat=1), min_examples=20).classifiers == {}
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / 'model.npz')
+    model = train(records(), min_examples=10)
+    model.save(path)
+
+    loaded = LocalModel.load(path)
+    assert loaded.version == model.version
+    for task in ('category', 'risk_level'):
+        assert loaded.classifiers[task].classes == model.classifiers[task].classes
+        for text in ('Smoke and fire at the shop', 'Pipe leaking water'):
+            assert loaded.predict(text, task) == model.predict(text, task)
+
+
+def test_one_class_classifier_is_not_loaded(tmp_path):
+    path = str(tmp_path / 'model.npz')
+    LocalModel({'category': HashedLinearClassifier(['fire'], n_features=16)}, '1').save(path)
+    loaded = LocalModel.load(path)
+    assert loaded.classifiers == {}
+    assert loaded.predict('anything', 'category') is None
@@ -0,0 +1,99 @@
+import random
+
+import pytest
+
+from priority_index import PriorityIndex, RedisPriorityIndex
+
+
+@pytest.fixture
+def fakeredis():
+    return pytest.importorskip('fakeredis')
+
+
+@pytest.fixture(params=['memory', 'redis'])
+def index(request):
+    if request.param == 'memory':
+        return PriorityIndex()
+    fakeredis = pytest.importorskip('fakeredis')
+    return RedisPriorityIndex(fakeredis.FakeRedis(decode_responses=True))
+
+
+def test_top_by_ward_and_category(index):
+    index.update('c1', 9.0, 'w1', 'Fire')
+    index.update('c2', 4.0, 'w1', 'garbage')
+    index.update('c3', 6.0, 'w2', 'garbage')
+    index.update('c4', 6.0, None, None)
+
+    assert index.top() == [('c1', 9.0), ('c3', 6.0), ('c4', 6.0), ('c2', 4.0)]
+    assert index.top(2) == [('c1', 9.0), ('c3', 6.0)]
+    assert index.top(ward='w1') == [('c1', 9.0), ('c2', 4.0)]
+    assert index.top(category='GARBAGE') == [('c3', 6.0), ('c2', 4.0)]
+    assert index.top(ward='w2', category='garbage') == [('c3', 6.0)]
+    assert index.top(ward='w3') == []
+    assert len(index) == 4
+    assert 'c4' in index
+
+
+def test_update_moves_complaint(index):
+    index.update('c1', 9.0, 'w1', 'fire')
+    index.update('c1', 3.0, 'w2', 'roads')
+    assert len(index) == 1
+    assert index.top(ward='w1') == []
+    assert index.top(category='fire') == []
+    assert index.top(ward='w2', category='roads') == [('c1', 3.0)]
+
+
+def test_remove(index):
+    index.update('c1', 9.0, 'w1', 'fire')
+    index.update('c2', 5.0, 'w1', 'fire')
+    assert index.remove('c1')
+    assert not index.remove('c1')
+    assert 'c1' not in index
+    assert index.top(ward='w1', category='fire') == [('c2', 5.0)]
+    assert len(index) == 1
+
+
+def test_redis_index_matches_in_memory_index(fakeredis):
+    rng = random.Random(0)
+    memory = PriorityIndex()
+    redis = RedisPriorityIndex(fakeredis.FakeRedis(decode_responses=True))
+    for _ in range(500):
+        complaint_id = f"c{rng.randrange(60)}"
+        if rng.random() < 0.2:
+            assert memory.remove(complaint_id) == redis.remove(complaint_id)
+        else:
+            args = (complaint_id, rng.choice([1.0, 2.5, 5.0, 9.5]),
+                    rng.choice([None, 'w1', 'w2']), rng.choice([None, 'fire', 'water']))
+            memory.update(*args)
+            redis.update(*args)
+
+    assert len(memory) == len(redis)
+    for ward in (None, 'w1', 'w2'):
+        for category in (None, 'fire', 'water'):
+            assert memory.top(100, ward, category) == redis.top(100, ward, category)
+
+
+def test_concurrent_moves_leave_no_stale_bucket(fakeredis, monkeypatch):
+    server = fakeredis.FakeServer()
+    first = RedisPriorityIndex(fakeredis.FakeRedis(server=server, decode_responses=True))
+    second = RedisPriorityIndex(fakeredis.FakeRedis(server=server, decode_responses=True))
+    first.update('c1', 5.0, 'w1', 'water')
+
+    read_entry = RedisPriorityIndex._read_entry
+    interleaved = []
+
+    def racing_read(self, client, complaint_id):
+        entry = read_entry(self, client, complaint_id)
+        if self is first and not interleaved:
+            # Another worker moves the complaint after this one has read it
+            interleaved.append(True)
+            second.update('c1', 7.0, 'w2', 'water')
+        return entry
+
+    monkeypatch.setattr(RedisPriorityIndex, '_read_entry', racing_read)
+    first.update('c1', 9.0, 'w3', 'water')
+
+    assert first.top(ward='w1') == []
+    assert first.top(ward='w2') == []
+    assert first.top(ward='w3') == [('c1', 9.0)]
+    assert first.top(category='water') == [('c1', 9.0)]
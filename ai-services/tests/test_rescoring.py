@@ -0,0 +1,134 @@
+import pytest
+
+from rescoring import RedisRescoringEngine, RescoringEngine, ScoreComponents, clamp_danger_score
+
+
+@pytest.fixture(params=['memory', 'redis'])
+def engine(request):
+    if request.param == 'memory':
+        return RescoringEngine()
+    fakeredis = pytest.importorskip('fakeredis')
+    return RedisRescoringEngine(fakeredis.FakeRedis(decode_responses=True))
+
+
+def test_priority_components():
+    record = ScoreComponents('c1')
+    record.update_danger(5.0, 'medium')
+    assert record.priority == 60
+    record.update_upvotes(3)
+    assert record.priority == 70
+    record.update_media(2)
+    record.update_history(10)
+    assert record.priority == 79
+
+    # Each component is capped, and the total is clamped to 0-100
+    record.update_upvotes(10 ** 6)
+    record.update_danger(9.5, 'critical')
+    assert record.upvote_component == 15.0
+    assert record.priority == 100
+
+
+def test_danger_score_is_clamped_to_ten():
+    assert clamp_danger_score(85) == 10.0
+    assert clamp_danger_score(-1) == 0.0
+    assert clamp_danger_score(None) == 0.0
+    record = ScoreComponents('c1')
+    record.update_danger(85, 'high')
+    assert record.danger_score == 10.0
+    assert record.priority == 100
+
+
+def test_state_round_trip():
+    record = ScoreComponents('c1')
+    record.category = 'water'
+    record.ward = 'w1'
+    record.update_danger(6.0, 'medium')
+    record.update_upvotes(4)
+    record.update_media(1)
+    record.update_history(2)
+    # Redis hands every field back as a string
+    state = {k: str(v) for k, v in record.state().items()}
+    restored = ScoreComponents.from_state('c1', state)
+    assert restored.to_dict() == record.to_dict()
+    assert restored.priority == record.priority
+
+
+def test_events_update_only_their_component(engine):
+    engine.upsert('c1', danger_score=6.0, risk_level='medium', category='Water', ward='w1')
+    record = engine.apply({'type': 'upvote', 'complaint_id': 'c1'})
+    assert record.upvotes == 1
+    assert record.category == 'water'
+    assert record.danger_score == 6.0
+
+    record = engine.apply({'type': 'upvote', 'complaint_id': 'c1', 'upvotes': 7})
+    assert record.upvotes == 7
+    record = engine.apply({'type': 'media_added', 'complaint_id': 'c1', 'delta': 2})
+    assert record.media_count == 2
+    record = engine.apply({'type': 'user_history', 'complaint_id': 'c1', 'previous_complaints': 3})
+    assert record.previous_complaints == 3
+    assert engine.get('c1').priority == record.priority == 60 + 10 + 15 + 4 + 3
+
+
+def test_events_for_unknown_complaints_are_skipped(engine):
+    assert engine.apply({'type': 'upvote', 'complaint_id': 'missing'}) is None
+    assert engine.get('missing') is None
+    with pytest.raises(ValueError):
+        engine.apply({'type': 'bogus', 'complaint_id': 'c1'})
+
+
+def test_created_event_registers_complaint(engine):
+    record = engine.apply({'type': 'created', 'complaint_id': 'c1', 'danger_score': 4.0,
+                           'risk_level': 'medium', 'category': 'roads', 'upvotes': 1})
+    assert record.priority == 40 + 10 + 5
+    assert engine.get('c1').category == 'roads'
+
+
+def test_apply_many_returns_distinct_records(engine):
+    engine.upsert('c1', danger_score=2.0, risk_level='low')
+    engine.upsert('c2', danger_score=3.0, risk_level='low')
+    touched = engine.apply_many([
+        {'type': 'upvote', 'complaint_id': 'c1'},
+        {'type': 'upvote', 'complaint_id': 'c1'},
+        {'type': 'upvote', 'complaint_id': 'c2'},
+        {'type': 'upvote', 'complaint_id': 'missing'},
+    ])
+    assert sorted((r.complaint_id, r.upvotes) for r in touched) == [('c1', 2), ('c2', 1)]
+
+
+def test_closed_complaints_stay_closed(engine):
+    engine.upsert('c1', danger_score=8.0, risk_level='high')
+    [record] = engine.apply_many([{'type': 'status_change', 'complaint_id': 'c1', 'status': 'Resolved'}])
+    [update] = engine.updates_for([record])
+    assert update['status'] == 'resolved'
+
+    # Re-scoring refreshes the danger score but keeps the status
+    record = engine.upsert('c1', danger_score=9.0, risk_level='critical')
+    assert not record.is_open
+    assert engine.updates_for([record])[0]['status'] == 'resolved'
+
+    record = engine.apply({'type': 'status_change', 'complaint_id': 'c1', 'status': 'open'})
+    assert record.is_open
+    assert record.danger_score == 9.0
+
+
+def test_concurrent_redis_events_are_not_lost(monkeypatch):
+    fakeredis = pytest.importorskip('fakeredis')
+    server = fakeredis.FakeServer()
+    first = RedisRescoringEngine(fakeredis.FakeRedis(server=server, decode_responses=True))
+    second = RedisRescoringEngine(fakeredis.FakeRedis(server=server, decode_responses=True))
+    first.upsert('c1', danger_score=5.0, risk_level='medium')
+
+    update_upvotes = ScoreComponents.update_upvotes
+    interleaved = []
+
+    def racing_update(record, upvotes):
+        if not interleaved:
+            # Another worker's upvote lands after this one has read the record
+            interleaved.append(True)
+            second.apply({'type': 'upvote', 'complaint_id': 'c1'})
+        update_upvotes(record, upvotes)
+
+    monkeypatch.setattr(ScoreComponents, 'update_upvotes', racing_update)
+    record = first.apply({'type': 'upvote', 'complaint_id': 'c1'})
+    assert record.upvotes == 2
+    assert second.get('c1').upvotes == 2
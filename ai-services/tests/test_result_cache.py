@@ -0,0 +1,111 @@
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+
+from result_cache import ResultCache
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResultCache(max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+    # 'a' was read after 'b', so 'b' goes
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert len(cache) == 2
+
+
+def test_falsy_results_are_cached():
+    cache = ResultCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return []
+
+    assert cache.get_or_compute('k', compute) == []
+    assert cache.get_or_compute('k', compute) == []
+    assert len(calls) == 1
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / 'cache.json')
+    cache = ResultCache(path=path, version='3')
+    cache.set('a', ('roads', 0.8))
+    cache.set('b', {'score': 4.0})
+    cache.save()
+
+    loaded = ResultCache(path=path, version='3')
+    assert loaded.get('a') == ('roads', 0.8)
+    assert loaded.get('b') == {'score': 4.0}
+
+
+def test_file_from_another_rules_version_is_discarded(tmp_path):
+    path = str(tmp_path / 'cache.json')
+    old = ResultCache(path=path, version='2')
+    old.set('a', 1)
+    old.save()
+
+    cache = ResultCache(path=path, version='3')
+    assert cache.get('a') is None
+    assert len(cache) == 0
+
+
+def test_corrupt_or_missing_file_is_ignored(tmp_path):
+    assert len(ResultCache(path=str(tmp_path / 'missing.json'))) == 0
+    path = tmp_path / 'cache.json'
+    path.write_text('{not json')
+    assert len(ResultCache(path=str(path))) == 0
+
+
+def test_load_keeps_at_most_max_entries(tmp_path):
+    path = str(tmp_path / 'cache.json')
+    big = ResultCache(path=path)
+    for i in range(5):
+        big.set(str(i), i)
+    big.save()
+
+    small = ResultCache(max_entries=2, path=path)
+    assert len(small) == 2
+    # The most recently used entries are kept
+    assert small.get('4') == 4 and small.get('3') == 3
+
+
+def test_autosave_writes_only_after_changes(tmp_path):
+    path = tmp_path / 'cache.json'
+    cache = ResultCache(path=str(path))
+    cache.start_autosave(0.01)
+    try:
+        time.sleep(0.1)
+        assert not path.exists()
+
+        cache.set('a', 1)
+        deadline = time.time() + 2
+        while not path.exists() and time.time() < deadline:
+            time.sleep(0.01)
+        assert json.loads(path.read_text())['entries'] == [['a', 1]]
+    finally:
+        cache.stop_autosave()
+
+
+def test_sigterm_saves_the_cache(tmp_path):
+    path = str(tmp_path / 'cache.json')
+    script = (
+        "import os, signal, time\n"
+        "from result_cache import ResultCache\n"
+        f"cache = ResultCache(path={path!r})\n"
+        "cache.persist_on_shutdown(autosave_seconds=0)\n"
+        "cache.set('a', 1)\n"
+        "os.kill(os.getpid(), signal.SIGTERM)\n"
+        "time.sleep(10)\n"
+    )
+    cwd = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, '-c', script], cwd=cwd, timeout=30)
+    assert result.returncode == 128 + signal.SIGTERM
+    assert ResultCache(path=path).get('a') == 1
@@ -0,0 +1,90 @@
+import pytest
+
+from categorization import ComplaintCategorizer
+from text_normalization import normalize_text
+
+
+@pytest.fixture
+def categorizer():
+    return ComplaintCategorizer()
+
+
+def test_english_tokens_are_stemmed_without_stopwords():
+    normalized = normalize_text('Leaking pipes near the school, PLEASE help!')
+    assert normalized.tokens == ('leak', 'pipe', 'school', 'help')
+    assert normalized.surface_words == ('leaking', 'pipes', 'school', 'help')
+    assert normalized.text == 'leaking pipes near the school please help'
+
+
+@pytest.mark.parametrize('word, meaning', [
+    ('गड्ढा', 'pothole'),
+    ('गड्ढे', 'pothole'),
+    ('गड्ढों', 'pothole'),
+    ('सड़कों', 'road'),
+    ('नालियों', 'drain'),
+    ('तारों', 'wire'),
+    ('पेड़ों', 'tree'),
+    ('खतरों', 'danger'),
+    ('कचरे', 'garbage'),
+    ('टूटी', 'broken'),
+])
+def test_hindi_inflections_map_like_the_lexicon_term(word, meaning):
+    normalized = normalize_text(word, 'hi')
+    assert normalized.text == meaning
+    assert normalized.tokens == (meaning,)
+    assert normalized.surface_words == (word,)
+
+
+@pytest.mark.parametrize('word, meaning', [
+    ('gaddha', 'pothole'),
+    ('gaddhe', 'pothole'),
+    ('gaddhon', 'pothole'),
+    ('khatre', 'danger'),
+    ('naliyon', 'drain'),
+    ('kachre', 'garbage'),
+    ('pedon', 'tree'),
+])
+def test_romanized_inflections_map_in_hindi_text(word, meaning):
+    assert normalize_text(word, 'hi').tokens == (meaning,)
+
+
+def test_romanized_stems_do_not_touch_english_text():
+    assert normalize_text('broken window pane', 'en').tokens == ('broken', 'window', 'pane')
+    # Exact lexicon terms still map in any language
+    assert normalize_text('gaddha', 'en').tokens == ('pothole',)
+
+
+def test_decomposed_nukta_is_normalized():
+    # ड़ typed as one code point (U+095C) or as ड + nukta
+    precomposed = 'सड़कों'
+    decomposed = 'सड़कों'
+    assert normalize_text(precomposed, 'hi').text == 'road'
+    assert normalize_text(decomposed, 'hi').text == 'road'
+
+
+@pytest.mark.parametrize('text, language, category', [
+    ('सड़कों पर गड्ढों से दुर्घटना', 'hi', 'roads'),
+    ('sadak par gaddhon se khatra', 'hi', 'roads'),
+    ('नालियों में कचरे की बदबू', 'hi', 'sanitation'),
+    ('naliyon mein kachre ki badboo', 'hi', 'sanitation'),
+    ('पाइप से पानी का रिसाव', 'hi', 'water'),
+    ('Large pothole on main road causing vehicle damage', 'en', 'roads'),
+])
+def test_categorization_of_hindi_and_romanized_text(categorizer, text, language, category):
+    assert categorizer.categorize(text, language)[0] == category
+
+
+def test_hindi_danger_keywords(categorizer):
+    score = categorizer.calculate_danger_score('बिजली के तारों से आग का खतरा', 'electric', 'hi')
+    plain = categorizer.calculate_danger_score('बिजली के तारों की शिकायत', 'electric', 'hi')
+    assert score > plain
+
+
+def test_hindi_and_english_complaints_are_duplicates(categorizer):
+    duplicates = categorizer.detect_duplicates(
+        'सड़क पर गड्ढों से खतरा',
+        [{'complaint_id': 'c1', 'description': 'pothole on road danger'}],
+        'hi'
+    )
+    assert [d['complaint_id'] for d in duplicates] == ['c1']
+    assert duplicates[0]['similarity'] == 1.0
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+JANMITRA AI Services - Text Normalization
+Shared multilingual normalization and tokenization for complaint text
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+from typing import FrozenSet, NamedTuple, Tuple, Union
+
+# Word characters plus Devanagari combining marks (matras, nukta, virama),
+# which `\w` alone splits words on. Dandas (U+0964/5) are punctuation.
+TOKEN_PATTERN = re.compile(r'(?:[^\W_]|[ऀ-ॣ०-ॿ])+')
+
+DEVANAGARI_PATTERN = re.compile(r'[ऀ-ॿ]')
+
+# Hindi (Devanagari) and romanized Hindi terms mapped to the English
+# vocabulary the rule-based scorers use
+LEXICON = {
+    # Hazards
+    'आग': 'fire', 'aag': 'fire',
+    'धुआं': 'smoke', 'धुआँ': 'smoke', 'dhuan': 'smoke', 'dhuaan': 'smoke',
+    'गैस': 'gas',
+    'रिसाव': 'leak', 'लीक': 'leak', 'risav': 'leak',
+    'विस्फोट': 'explosion', 'धमाका': 'explosion', 'dhamaka': 'explosion',
+    'बाढ़': 'flood', 'baadh': 'flood', 'badh': 'flood',
+    'खतरा': 'danger', 'ख़तरा': 'danger', 'khatra': 'danger', 'khatara': 'danger',
+    'खतरनाक': 'dangerous', 'ख़तरनाक': 'dangerous', 'khatarnak': 'dangerous', 'khatarnaak': 'dangerous',
+    'दुर्घटना': 'accident', 'हादसा': 'accident', 'durghatna': 'accident', 'hadsa': 'accident',
+    'घायल': 'injury', 'चोट': 'injury', 'ghayal': 'injury', 'chot': 'injury',
+    'आपातकाल': 'emergency', 'आपात': 'emergency', 'aapatkal': 'emergency',
+    'तुरंत': 'urgent', 'जल्दी': 'urgent', 'turant': 'urgent', 'jaldi': 'urgent',
+    'मदद': 'help', 'madad': 'help',
+    'टूटा': 'broken', 'टूटी': 'broken', 'टूटे': 'broken', 'toota': 'broken', 'tuta': 'broken',
+    'tooti': 'broken', 'tuti': 'broken',
+    'ढह': 'collapse', 'ढहा': 'collapse', 'ढही': 'collapse',
+    'करंट': 'shock', 'karant': 'shock',
+    # Roads and traffic
+    'सड़क': 'road', 'सडक': 'road', 'sadak': 'road', 'sarak': 'road',
+    'गड्ढा': 'pothole', 'गड्ढे': 'pothole', 'गड्डा': 'pothole', 'gaddha': 'pothole', 'gadda': 'pothole',
+    'gaddhe': 'pothole', 'gadde': 'pothole',
+    'यातायात': 'traffic', 'ट्रैफिक': 'traffic',
+    'जाम': 'jam',
+    # Sanitation
+    'कचरा': 'garbage', 'कूड़ा': 'garbage', 'कूडा': 'garbage', 'kachra': 'garbage', 'kuda': 'garbage',
+    'kooda': 'garbage',
+    'नाली': 'drain', 'naali': 'drain', 'nali': 'drain',
+    'सीवर': 'sewer',
+    'बदबू': 'smell', 'badbu': 'smell', 'badboo': 'smell',
+    'गंदा': 'dirty', 'गंदी': 'dirty', 'गंदगी': 'dirty', 'ganda': 'dirty', 'gandi': 'dirty', 'gandagi': 'dirty',
+    'सफाई': 'clean', 'safai': 'clean', 'saphai': 'clean',
+    # Electricity
+    'बिजली': 'electricity', 'bijli': 'electricity', 'bijlee': 'electricity',
+    'तार': 'wire', 'taar': 'wire',
+    'खंभा': 'pole', 'खम्भा': 'pole', 'khamba': 'pole', 'khambha': 'pole',
+    'बत्ती': 'light', 'रोशनी': 'light', 'batti': 'light',
+    # Water
+    'पानी': 'water', 'जल': 'water', 'paani': 'water', 'pani': 'water',
+    'पाइप': 'pipe',
+    'आपूर्ति': 'supply', 'सप्लाई': 'supply',
+    'टंकी': 'tank', 'tanki': 'tank',
+    # Parks
+    'पेड़': 'tree', 'पेड': 'tree', 'ped': 'tree',
+    'पार्क': 'park', 'बगीचा': 'garden', 'bagicha': 'garden',
+    # Negation is part of several category patterns (e.g. 'light.*not.*work')
+    'नहीं': 'not', 'नही': 'not', 'nahi': 'not', 'nahin': 'not', 'nahee': 'not',
+}
+
+STOPWORDS = {
+    'en': frozenset([
+        'a', 'an', 'the', 'and', 'or', 'but', 'is', 'are', 'was', 'were', 'be', 'been',
+        'am', 'has', 'have', 'had', 'do', 'does', 'did', 'of', 'in', 'on', 'at', 'to',
+        'for', 'from', 'by', 'with', 'near', 'this', 'that', 'these', 'those', 'it',
+        'its', 'there', 'here', 'i', 'we', 'our', 'my', 'me', 'you', 'your', 'he', 'she',
+        'they', 'them', 'their', 'very', 'so', 'too', 'also', 'not', 'no', 'please',
+    ]),
+    'hi': frozenset([
+        'है', 'हैं', 'था', 'थी', 'थे', 'का', 'की', 'के', 'में', 'से', 'को', 'पर', 'और',
+        'यह', 'वह', 'ये', 'वो', 'हो', 'भी', 'ही', 'तो', 'एक', 'कि', 'जो', 'कर', 'रहा',
+        'रही', 'रहे', 'गया', 'गई', 'बहुत', 'हम', 'मैं', 'मेरे', 'हमारे', 'कृपया',
+        # Romanized
+        'hai', 'hain', 'tha', 'thi', 'the', 'ka', 'ki', 'ke', 'mein', 'me', 'se', 'ko',
+        'par', 'aur', 'yeh', 'ye', 'woh', 'vo', 'ho', 'bhi', 'hi', 'to', 'ek', 'kar',
+        'raha', 'rahi', 'rahe', 'gaya', 'gayi', 'bahut', 'hum', 'main', 'mere', 'kripya',
+    ]),
+}
+
+# Lexicon keys must match the NFKC form that input text is normalized to
+LEXICON = {unicodedata.normalize('NFKC', k): v for k, v in LEXICON.items()}
+STOPWORDS = {
+    lang: frozenset(unicodedata.normalize('NFKC', w) for w in words)
+    for lang, words in STOPWORDS.items()
+}
+
+# Hindi inflectional suffixes, longest first
+HINDI_SUFFIXES = tuple(unicodedata.normalize('NFKC', s) for s in (
+    'ियों', 'ाओं', 'ाएं', 'ाएँ', 'ों', 'ें', 'ीं', 'ियां', 'ियाँ', 'ा', 'ी', 'े'
+))
+
+# Romanized Hindi inflections (gaddhon, khatre, naliyon), longest first
+ROMANIZED_SUFFIXES = ('iyon', 'iyan', 'on', 'en', 'a', 'e', 'i')
+
+
+def _strip_suffix(word: str, suffixes: Tuple[str, ...], min_stem: int) -> str:
+    for suffix in suffixes:
+        if word.endswith(suffix) and len(word) - len(suffix) >= min_stem:
+            return word[:-len(suffix)]
+    return word
+
+
+# Stems of the lexicon terms, so any inflection of a term maps like the term
+# itself (गड्ढों and गड्ढे -> गड्ढ -> pothole). Romanized stems are only used
+# for Hindi text, where they can't collide with English words.
+HINDI_STEMS: dict = {}
+ROMANIZED_STEMS: dict = {}
+for _term, _meaning in LEXICON.items():
+    if DEVANAGARI_PATTERN.search(_term):
+        HINDI_STEMS.setdefault(_strip_suffix(_term, HINDI_SUFFIXES, 2), _meaning)
+    else:
+        ROMANIZED_STEMS.setdefault(_strip_suffix(_term, ROMANIZED_SUFFIXES, 3), _meaning)
+
+
+class NormalizedText(NamedTuple):
+    """Normalized form of a complaint text, computed once and shared by all scorers."""
+    language: str
+    # Casefolded text with every word that has a lexicon stem (inflections
+    # included) mapped to English, stopwords kept, for keyword/pattern matching
+    text: str
+    # Stemmed content tokens with stopwords removed, in order of appearance
+    tokens: Tuple[str, ...]
+    # Distinct content tokens, for set similarity
+    terms: FrozenSet[str]
+    # Casefolded content words as written (not mapped or stemmed), for display
+    surface_words: Tuple[str, ...]
+
+
+def _map_word(word: str, romanized: bool) -> str:
+    """Map a Hindi or romanized Hindi word, or any inflection of one, to English"""
+    mapped = LEXICON.get(word)
+    if mapped:
+        return mapped
+    if DEVANAGARI_PATTERN.search(word):
+        return HINDI_STEMS.get(_strip_suffix(word, HINDI_SUFFIXES, 2), word)
+    if romanized:
+        return ROMANIZED_STEMS.get(_strip_suffix(word, ROMANIZED_SUFFIXES, 3), word)
+    return word
+
+
+def _stem(token: str) -> str:
+    """Light suffix stripping; keeps stems of at least three characters"""
+    if DEVANAGARI_PATTERN.search(token):
+        return _strip_suffix(token, HINDI_SUFFIXES, 2)
+
+    if token.endswith('ies') and len(token) > 4:
+        return token[:-3] + 'y'
+    if token.endswith('sses'):
+        return token[:-2]
+    for suffix in ('ing', 'ed'):
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            return token[:-len(suffix)]
+    if token.endswith('s') and not token.endswith(('ss', 'us')) and len(token) > 3:
+        return token[:-1]
+    return token
+
+
+@lru_cache(maxsize=8192)
+def normalize_text(text: str, language: str = 'en') -> NormalizedText:
+    """
+    Normalize complaint text: Unicode NFKC + casefold, tokenize (Devanagari
+    aware), map Hindi/romanized Hindi terms and their inflections to English,
+    drop stopwords and stem. Results are cached, so repeated calls for the
+    same text are free.
+    """
+    language = (language or 'en').lower()
+    folded = unicodedata.normalize('NFKC', text or '').casefold()
+    surface = TOKEN_PATTERN.findall(folded)
+    romanized = language == 'hi'
+    words = [_map_word(word, romanized) for word in surface]
+
+    stopwords = STOPWORDS['en'] | STOPWORDS.get(language, frozenset())
+    content = [i for i, word in enumerate(words) if word not in stopwords]
+    tokens = tuple(_stem(words[i]) for i in content)
+    return NormalizedText(
+        language=language,
+        text=' '.join(words),
+        tokens=tokens,
+        terms=frozenset(tokens),
+        surface_words=tuple(surface[i] for i in content),
+    )
+
+
+def as_normalized(text: Union[str, NormalizedText], language: str = 'en') -> NormalizedText:
+    """Accept either raw text or an already normalized complaint"""
+    if isinstance(text, NormalizedText):
+        return text
+    return normalize_text(text, language)
@@ -60,6 +60,42 @@ class AIClient {
     }
   }
 
+  /**
+   * Queue an analysis job on the AI service without waiting for the result
+   * @param {string} type - 'danger_score' or 'auto_description'
+   * @param {Object} complaint - Complaint data in the AI service's ComplaintData shape
+   * @param {string} [callbackUrl] - URL the AI service POSTs the finished job to
+   * @returns {Promise<Object>} Queued job ({ job_id, status, ... })
+   */
+  async submitAnalysisJob(type, complaint, callbackUrl) {
+    try {
+      const response = await this.client.post('/api/ai/jobs', {
+        type,
+        complaint,
+        callback_url: callbackUrl
+      });
+      return response.data;
+    } catch (error) {
+      logger.error('Failed to submit AI analysis job:', error);
+      throw this._handleError(error, 'Failed to submit analysis job');
+    }
+  }
+
+  /**
+   * Get the status (and result, once done) of an analysis job
+   * @param {string} jobId - Job ID returned by submitAnalysisJob
+   * @returns {Promise<Object>} Job status
+   */
+  async getAnalysisJob(jobId) {
+    try {
+      const response = await this.client.get(`/api/ai/jobs/${jobId}`);
+      return response.data;
+    } catch (error) {
+      logger.error('Failed to get AI analysis job:', error);
+      throw this._handleError(error, 'Failed to get analysis job');
+    }
+  }
+
   /**
    * Submit feedback about AI analysis
    * @param {Object} feedback - Feedback data